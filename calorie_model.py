@@ -1,34 +1,410 @@
 # calorie_model.py — Final robust ML model for calorie prediction
-import pandas as pd
-import joblib
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import r2_score, mean_absolute_error
+# pandas / scikit-learn / joblib are imported inside the training, legacy
+# and large-batch paths only: serving from a bundle needs just NumPy.
+from datetime import datetime, timezone
+from feature_encoder import FeatureEncoder
+from flat_forest import FlatForest
+import numpy as np
+import gc
+import hashlib
+import json
 import os
+import shutil
+import threading
+
+BUNDLE_DIR = "calorie_model_bundle"
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Installed bundles live in <bundle dir>/versions/<version>/ and are never
+# modified; current.json names the active one and is swapped atomically.
+POINTER_NAME = "current.json"
+VERSIONS_DIR = "versions"
+KEEP_BUNDLE_VERSIONS = 3
+# Batches up to this size go through the flattened forest; larger ones
+# amortize sklearn's per-call overhead and use model.predict.
+FLAT_FOREST_MAX_ROWS = 64
+# Bump whenever load_training_data(), the split or the scaling changes, so
+# cached artifacts trained by the old pipeline stop matching.
+FEATURE_PIPELINE_VERSION = 1
+MODEL_STORE_DIR = ".model_store"
+PROVENANCE_LOG = "provenance.jsonl"
+
+
+# =========================================================
+# Model Bundle (model + scaler + feature schema + manifest)
+# =========================================================
+class ModelBundle:
+    """Everything prediction needs, loaded from one self-describing directory."""
+
+    def __init__(self, model, scaler, feature_columns, categories=None,
+                 metadata=None, path=None, encoder=None, forest=None,
+                 model_loader=None, scaler_loader=None):
+        self._model = model
+        self._model_loader = model_loader
+        self._model_lock = threading.Lock()
+        self._scaler = scaler
+        self._scaler_loader = scaler_loader
+        self.feature_columns = list(feature_columns)
+        self.categories = dict(categories or {})
+        self.metadata = dict(metadata or {})
+        self.path = path
+        self.encoder = encoder or FeatureEncoder.from_schema(
+            self.feature_columns, self.categories, self.scaler)
+        self.forest = forest
+
+    @property
+    def model(self):
+        """
+        The sklearn estimator. With a flat forest available it is only
+        unpickled when first needed (large batches), so workers that only
+        serve single rows never hold a private copy of it.
+        """
+        if self._model is None and self._model_loader is not None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._model_loader()
+        return self._model
+
+    @property
+    def scaler(self):
+        """The fitted StandardScaler (only unpickled on demand; the encoder has it folded in)."""
+        if self._scaler is None and self._scaler_loader is not None:
+            with self._model_lock:
+                if self._scaler is None:
+                    self._scaler = self._scaler_loader()
+        return self._scaler
+
+    def predict(self, X):
+        """Predict encoded rows, via the flat forest when the batch is small."""
+        if self.forest is not None and len(X) <= FLAT_FOREST_MAX_ROWS:
+            return self.forest.predict(X)
+        return self.model.predict(X)
+
+
+def _flatten_or_none(model):
+    try:
+        return FlatForest.from_estimator(model)
+    except TypeError:
+        return None
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json_atomic(path, payload):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def save_bundle(bundle_dir, model, scaler, feature_columns, categories, metadata,
+                encoder=None, forest=None):
+    """
+    Write model.joblib + scaler.joblib (+ the flat forest node arrays as
+    .npy files) and then manifest.json. The manifest is written last
+    (atomically), so readers never see a manifest whose checksums describe
+    half-written files.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    import joblib
+
+    files = ["model.joblib", "scaler.joblib"]
+    joblib.dump(model, os.path.join(bundle_dir, "model.joblib"))
+    joblib.dump(scaler, os.path.join(bundle_dir, "scaler.joblib"))
+
+    forest_info = None
+    if forest is not None:
+        forest_info = {"max_depth": forest.max_depth, "n_trees": forest.n_trees,
+                       "n_nodes": forest.n_nodes, "files": {}}
+        for name, arr in forest.arrays().items():
+            fname = f"forest_{name}.npy"
+            np.save(os.path.join(bundle_dir, fname), arr)
+            forest_info["files"][name] = fname
+            files.append(fname)
+
+    feature_columns = [str(c) for c in feature_columns]
+    categories = {str(k): [str(v) for v in vals] for k, vals in categories.items()}
+    encoder = encoder or FeatureEncoder.from_schema(feature_columns, categories, scaler)
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ"),
+        "feature_columns": feature_columns,
+        "categories": categories,
+        "encoder": encoder.to_dict(),
+        "forest": forest_info,
+        "metadata": metadata,
+        "files": {
+            name: {"sha256": _sha256(os.path.join(bundle_dir, name)),
+                   "size": os.path.getsize(os.path.join(bundle_dir, name))}
+            for name in files
+        },
+    }
+    _write_json_atomic(os.path.join(bundle_dir, MANIFEST_NAME), manifest)
+    return manifest
+
+
+def active_bundle_dir(bundle_dir):
+    """
+    Directory holding the active bundle files: the version named by
+    current.json if there is one, else bundle_dir itself (flat layout, as
+    written by save_bundle()).
+    """
+    try:
+        with open(os.path.join(bundle_dir, POINTER_NAME), encoding="utf-8") as f:
+            pointer = json.load(f)
+    except FileNotFoundError:
+        return bundle_dir
+    return os.path.join(bundle_dir, VERSIONS_DIR, pointer["version"])
+
+
+def read_manifest(bundle_dir):
+    with open(os.path.join(active_bundle_dir(bundle_dir), MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def validate_bundle(bundle_dir, manifest=None, checksums=True):
+    """
+    Check a bundle against its manifest. Sizes are always compared (a stat
+    call per file); checksums=True also re-hashes every file.
+    Raises ValueError on the first mismatch.
+    """
+    bundle_dir = active_bundle_dir(bundle_dir)
+    manifest = manifest or read_manifest(bundle_dir)
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"⚠️ Unsupported bundle format: {manifest.get('format_version')}")
+    for name, info in manifest["files"].items():
+        path = os.path.join(bundle_dir, name)
+        if not os.path.exists(path):
+            raise ValueError(f"⚠️ Bundle file missing: {name}")
+        if os.path.getsize(path) != info["size"]:
+            raise ValueError(f"⚠️ Bundle file size mismatch: {name}")
+        if checksums and _sha256(path) != info["sha256"]:
+            raise ValueError(f"⚠️ Bundle checksum mismatch: {name}")
+    return manifest
+
+
+def load_bundle(bundle_dir=BUNDLE_DIR, checksums=True, mmap_mode="r"):
+    """
+    Load and validate a bundle written by save_bundle().
+    Forest node arrays are memory-mapped (mmap_mode="r"), so every process on
+    the host shares one page-cache copy; the sklearn model is then loaded
+    lazily. mmap_mode=None reads everything into private memory up front.
+    """
+    bundle_dir = active_bundle_dir(bundle_dir)
+    manifest = validate_bundle(bundle_dir, checksums=checksums)
+    encoder = None
+    if "encoder" in manifest:
+        encoder = FeatureEncoder.from_dict(manifest["feature_columns"], manifest["encoder"])
+    forest = None
+    info = manifest.get("forest")
+    if info:
+        arrays = {name: np.load(os.path.join(bundle_dir, fname), mmap_mode=mmap_mode)
+                  for name, fname in info["files"].items()}
+        forest = FlatForest.from_arrays(arrays, info["max_depth"])
+
+    model_path = os.path.join(bundle_dir, "model.joblib")
+    scaler_path = os.path.join(bundle_dir, "scaler.joblib")
+    lazy = forest is not None and mmap_mode is not None
+    return ModelBundle(
+        model=None if lazy else _joblib_load(model_path),
+        model_loader=lambda: _joblib_load(model_path),
+        scaler=None if encoder is not None else _joblib_load(scaler_path),
+        scaler_loader=lambda: _joblib_load(scaler_path),
+        feature_columns=manifest["feature_columns"],
+        categories=manifest.get("categories"),
+        metadata=dict(manifest.get("metadata") or {}, version=manifest.get("version")),
+        path=bundle_dir,
+        encoder=encoder,
+        forest=forest,
+    )
+
+
+def _joblib_load(path):
+    import joblib
+    return joblib.load(path)
+
+
+def _load_legacy_bundle(model_path, scaler_path):
+    """Wrap pre-bundle calorie_model.pkl/scaler.pkl artifacts."""
+    model = _joblib_load(model_path)
+    scaler = _joblib_load(scaler_path)
+    # The scaler was fit on the one-hot DataFrame, so it remembers the columns
+    feature_columns = getattr(model, "feature_names_in_", None)
+    if feature_columns is None:
+        feature_columns = getattr(scaler, "feature_names_in_", None)
+    if feature_columns is None:
+        raise ValueError("⚠️ Legacy model has no feature schema; retrain with train_calorie_model().")
+    return ModelBundle(model, scaler, feature_columns, path=model_path,
+                       forest=_flatten_or_none(model))
+
+
+# =========================================================
+# Training Artifact Cache (fingerprint → stored bundle)
+# =========================================================
+def training_fingerprint(data_sha256, target, estimator):
+    """
+    Hash of everything that determines a trained bundle: the input data, the
+    feature pipeline and the estimator class + parameters. n_jobs/verbose
+    only change how fast training runs, not its result, and are left out.
+    """
+    import sklearn
+
+    params = {k: v for k, v in estimator.get_params(deep=False).items()
+              if k not in ("n_jobs", "verbose")}
+    payload = {
+        "data_sha256": data_sha256,
+        "target": target,
+        "feature_pipeline_version": FEATURE_PIPELINE_VERSION,
+        "bundle_format_version": BUNDLE_FORMAT_VERSION,
+        "estimator": f"{type(estimator).__module__}.{type(estimator).__name__}",
+        "params": params,
+        "sklearn_version": sklearn.__version__,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=repr).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _stored_bundle(store_dir, fingerprint):
+    """Path of a valid stored bundle for this fingerprint, or None."""
+    path = os.path.join(store_dir, fingerprint[:16])
+    try:
+        manifest = validate_bundle(path, checksums=False)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("metadata", {}).get("fingerprint") != fingerprint:
+        return None
+    return path
+
+
+def _install_bundle(src_dir, dst_dir):
+    """
+    Install a stored bundle at the serving location without touching the
+    files running processes have memory-mapped: copy it into a fresh
+    dst_dir/versions/<version>/ (temp dir + rename), then atomically
+    replace current.json to point at it. The registry notices the new
+    pointer on its next lookup; older versions are pruned, which is safe
+    for mappings still open on them.
+    """
+    version = read_manifest(src_dir)["version"]
+    versions_dir = os.path.join(dst_dir, VERSIONS_DIR)
+    target_dir = os.path.join(versions_dir, version)
+    os.makedirs(versions_dir, exist_ok=True)
+    if not os.path.exists(os.path.join(target_dir, MANIFEST_NAME)):
+        tmp_dir = f"{target_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.copytree(src_dir, tmp_dir)
+        try:
+            os.rename(tmp_dir, target_dir)
+        except OSError:
+            # Another process installed the same version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    _write_json_atomic(os.path.join(dst_dir, POINTER_NAME), {"version": version})
+    _prune_versions(versions_dir, keep=version)
+
+
+def _prune_versions(versions_dir, keep):
+    """Drop all but the newest KEEP_BUNDLE_VERSIONS installed versions (never `keep`)."""
+    installed = sorted(v for v in os.listdir(versions_dir) if ".tmp-" not in v)
+    for version in installed[:-KEEP_BUNDLE_VERSIONS]:
+        if version != keep:
+            shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+
+
+def _record_provenance(store_dir, manifest, reused):
+    entry = {
+        "logged_at": datetime.now(timezone.utc).isoformat(),
+        "event": "reused" if reused else "trained",
+        "bundle_version": manifest.get("version"),
+    }
+    meta = manifest.get("metadata", {})
+    for key in ("fingerprint", "data_path", "data_sha256", "estimator", "params", "r2", "mae"):
+        entry[key] = meta.get(key)
+    with open(os.path.join(store_dir, PROVENANCE_LOG), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, default=repr) + "\n")
 
 
 # =========================================================
 # Train and Save the Model
 # =========================================================
-def train_calorie_model(data_path="fitnessdataset_augmented.xlsx",
-                        target="Current Calorie Intake",
-                        out_dir="."):
-    print(f"📂 Loading dataset from {data_path} ...")
+def load_training_data(data_path="fitnessdataset_augmented.xlsx",
+                       target="Current Calorie Intake"):
+    """
+    Load the dataset and build the one-hot training matrix.
+    Returns (X, y, categories, n_rows).
+    """
+    import pandas as pd
+    from dataset_cache import load_dataset
 
-    # Load dataset
-    if data_path.endswith(".xlsx"):
-        df = pd.read_excel(data_path)
-    else:
-        df = pd.read_csv(data_path)
+    # Load dataset (columnar cache; only the first run parses the spreadsheet)
+    df = load_dataset(data_path)
 
     # Drop NA target values
     df = df.dropna(subset=[target])
     y = df[target]
     X = df.drop(columns=[target])
 
+    # Category vocabularies (in the order get_dummies lays them out)
+    categorical_columns = list(X.select_dtypes(exclude="number").columns)
+    categories = {c: sorted(X[c].dropna().astype(str).unique()) for c in categorical_columns}
+
     # One-hot encode categorical features
     X = pd.get_dummies(X, drop_first=True)
+    return X, y, categories, len(df)
+
+
+def default_estimator():
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(n_estimators=200, random_state=42)
+
+
+def train_calorie_model(data_path="fitnessdataset_augmented.xlsx",
+                        target="Current Calorie Intake",
+                        out_dir=".",
+                        estimator=None,
+                        force=False):
+    """
+    Train, evaluate and save a model bundle. `estimator` is any unfitted
+    sklearn regressor (e.g. the winner of model_search); defaults to the
+    200-tree random forest.
+
+    Bundles are kept in out_dir/.model_store/ under their training
+    fingerprint; if the same data + pipeline + parameters were trained
+    before, that bundle is installed again without retraining (force=True
+    retrains anyway). Every run is appended to .model_store/provenance.jsonl.
+    """
+    import sklearn
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    model = estimator if estimator is not None else default_estimator()
+    bundle_dir = os.path.join(out_dir, BUNDLE_DIR)
+    store_dir = os.path.join(out_dir, MODEL_STORE_DIR)
+    os.makedirs(store_dir, exist_ok=True)
+
+    data_sha256 = _sha256(data_path)
+    fingerprint = training_fingerprint(data_sha256, target, model)
+    cached = None if force else _stored_bundle(store_dir, fingerprint)
+    if cached is not None:
+        manifest = read_manifest(cached)
+        active = None
+        if os.path.exists(os.path.join(active_bundle_dir(bundle_dir), MANIFEST_NAME)):
+            active = read_manifest(bundle_dir).get("metadata", {}).get("fingerprint")
+        if active != fingerprint:
+            _install_bundle(cached, bundle_dir)
+        _record_provenance(store_dir, manifest, reused=True)
+        print(f"♻️ Reusing model bundle {manifest['version']} (fingerprint {fingerprint[:12]})")
+        return bundle_dir
+
+    print(f"📂 Loading dataset from {data_path} ...")
+    X, y, categories, n_rows = load_training_data(data_path, target)
 
     # Split dataset
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -38,81 +414,318 @@ def train_calorie_model(data_path="fitnessdataset_augmented.xlsx",
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
 
-    # Train model
-    model = RandomForestRegressor(n_estimators=200, random_state=42)
-    model.fit(X_train_scaled, y_train)
+    # Train model (all cores for fitting; served single-threaded per worker)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=-1)
+        model.fit(X_train_scaled, y_train)
+        model.set_params(n_jobs=None)
+    else:
+        model.fit(X_train_scaled, y_train)
 
     # Evaluate
     preds = model.predict(X_test_scaled)
-    print(f"✅ R² Score: {r2_score(y_test, preds):.3f}")
-    print(f"✅ MAE: {mean_absolute_error(y_test, preds):.2f} kcal")
+    r2 = r2_score(y_test, preds)
+    mae = mean_absolute_error(y_test, preds)
+    print(f"✅ R² Score: {r2:.3f}")
+    print(f"✅ MAE: {mae:.2f} kcal")
 
-    # Save model and scaler
-    joblib.dump(model, os.path.join(out_dir, "calorie_model.pkl"))
-    joblib.dump(scaler, os.path.join(out_dir, "scaler.pkl"))
-    print("💾 Saved calorie_model.pkl and scaler.pkl successfully!")
+    # Save one self-describing bundle
+    metadata = {
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "data_path": os.path.basename(data_path),
+        "data_sha256": data_sha256,
+        "fingerprint": fingerprint,
+        "target": target,
+        "n_rows": int(n_rows),
+        "n_train": int(len(X_train)),
+        "n_test": int(len(X_test)),
+        "r2": float(r2),
+        "mae": float(mae),
+        "estimator": type(model).__name__,
+        "params": {k: v for k, v in model.get_params().items()
+                   if v is None or isinstance(v, (bool, int, float, str))},
+        "sklearn_version": sklearn.__version__,
+    }
+    encoder = FeatureEncoder.from_schema(X.columns, categories, scaler)
+    forest = _flatten_or_none(model)  # export for the NumPy fast path
+    stored_dir = os.path.join(store_dir, fingerprint[:16])
+    manifest = save_bundle(stored_dir, model, scaler, X.columns, categories, metadata,
+                           encoder, forest)
+    _install_bundle(stored_dir, bundle_dir)
+    _record_provenance(store_dir, manifest, reused=False)
+    print(f"💾 Saved model bundle {manifest['version']} to {bundle_dir} successfully!")
+    return bundle_dir
 
 
 # =========================================================
-# Predict Calories (robust version)
+# Incremental Update (warm_start: add trees for new data)
 # =========================================================
-def predict_calories(input_dict,
-                     model_path="calorie_model.pkl",
-                     scaler_path="scaler.pkl"):
+def update_calorie_model(new_data_path,
+                         target="Current Calorie Intake",
+                         out_dir=".",
+                         n_new_trees=50,
+                         max_trees=None):
     """
-    Predict calorie needs based on user input features.
-    Works with all sklearn versions (auto-detects input columns).
+    Grow the active forest with `n_new_trees` trees fitted only on the new
+    labelled profiles (warm_start), so the cost scales with the new data
+    rather than the full history. The original scaler and feature layout are
+    kept (new rows go through the bundle's encoder). With `max_trees`, the
+    oldest trees are dropped to keep the ensemble size bounded.
     """
-    import os
-    import joblib
-    import pandas as pd
+    from sklearn.metrics import mean_absolute_error
+    from dataset_cache import load_dataset
 
-    # ✅ Try current folder first, then fallback to script folder
-    if not os.path.exists(model_path):
-        model_path = os.path.join(os.path.dirname(__file__), "calorie_model.pkl")
-    if not os.path.exists(scaler_path):
-        scaler_path = os.path.join(os.path.dirname(__file__), "scaler.pkl")
+    bundle_dir = os.path.join(out_dir, BUNDLE_DIR)
+    store_dir = os.path.join(out_dir, MODEL_STORE_DIR)
+    os.makedirs(store_dir, exist_ok=True)
+    bundle = load_bundle(bundle_dir, mmap_mode=None)
+    model = bundle.model
+    if "warm_start" not in model.get_params() or not hasattr(model, "estimators_"):
+        raise TypeError(f"⚠️ {type(model).__name__} cannot be grown incrementally; retrain instead.")
 
-    # ✅ Load trained model and scaler
-    print(f"📁 Loading model from: {model_path}")
-    print(f"📁 Loading scaler from: {scaler_path}")
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
+    data_sha256 = _sha256(new_data_path)
+    parent_fp = bundle.metadata.get("fingerprint", bundle.metadata.get("version"))
+    blob = json.dumps([parent_fp, data_sha256, target, n_new_trees, max_trees]).encode("utf-8")
+    fingerprint = hashlib.sha256(blob).hexdigest()
+    cached = _stored_bundle(store_dir, fingerprint)
+    if cached is not None:
+        _install_bundle(cached, bundle_dir)
+        manifest = read_manifest(bundle_dir)
+        _record_provenance(store_dir, manifest, reused=True)
+        print(f"♻️ Reusing updated bundle {manifest['version']} (fingerprint {fingerprint[:12]})")
+        return bundle_dir
+
+    print(f"📂 Loading new profiles from {new_data_path} ...")
+    df = load_dataset(new_data_path).dropna(subset=[target])
+    y_new = df[target].to_numpy(dtype=np.float64)
+    records = df.drop(columns=[target]).to_dict("records")
+    X_new = bundle.encoder.encode_many(
+        [{k: v for k, v in r.items() if not (isinstance(v, float) and v != v)} for r in records])
+
+    mae_before = mean_absolute_error(y_new, model.predict(X_new))
+
+    # Add trees fitted on the new rows only
+    n_old = len(model.estimators_)
+    params = {"warm_start": True, "n_estimators": n_old + n_new_trees}
+    if "n_jobs" in model.get_params():
+        params["n_jobs"] = -1
+    model.set_params(**params)
+    model.fit(X_new, y_new)
+    model.set_params(warm_start=False, **({"n_jobs": None} if "n_jobs" in params else {}))
+
+    # Keep the ensemble bounded: oldest trees go first
+    dropped = 0
+    if max_trees and len(model.estimators_) > max_trees:
+        dropped = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[dropped:]
+        model.n_estimators = len(model.estimators_)
+
+    mae_after = mean_absolute_error(y_new, model.predict(X_new))
+    print(f"🌱 Trees: {n_old} → {len(model.estimators_)} (+{n_new_trees}, -{dropped})")
+    print(f"✅ MAE on new profiles: {mae_before:.2f} → {mae_after:.2f} kcal")
+
+    metadata = dict(bundle.metadata)
+    metadata.pop("version", None)
+    metadata.update({
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "fingerprint": fingerprint,
+        "parent_fingerprint": parent_fp,
+        "parent_version": bundle.metadata.get("version"),
+        "update": {
+            "data_path": os.path.basename(new_data_path),
+            "data_sha256": data_sha256,
+            "n_rows": int(len(df)),
+            "trees_added": n_new_trees,
+            "trees_dropped": dropped,
+            "mae_before": float(mae_before),
+            "mae_after": float(mae_after),
+        },
+        "n_rows": int(bundle.metadata.get("n_rows", 0)) + int(len(df)),
+        "params": {k: v for k, v in model.get_params().items()
+                   if v is None or isinstance(v, (bool, int, float, str))},
+    })
+    stored_dir = os.path.join(store_dir, fingerprint[:16])
+    manifest = save_bundle(stored_dir, model, bundle.scaler, bundle.feature_columns,
+                           bundle.categories, metadata, bundle.encoder,
+                           _flatten_or_none(model))
+    _install_bundle(stored_dir, bundle_dir)
+    _record_provenance(store_dir, manifest, reused=False)
+    print(f"💾 Saved updated model bundle {manifest['version']} to {bundle_dir} successfully!")
+    return bundle_dir
+
+
+# =========================================================
+# Model Registry (load once per process, hot reload on retrain)
+# =========================================================
+def _resolve_artifact(path, default_name):
+    """Try the given path first, then fall back to the script folder."""
+    if not os.path.exists(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), default_name)
+    return path
+
+
+def _file_stamp(path):
+    """Cheap change marker for an artifact: (mtime_ns, size)."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _legacy_paths(bundle_dir):
+    parent = os.path.dirname(os.path.abspath(bundle_dir))
+    return os.path.join(parent, "calorie_model.pkl"), os.path.join(parent, "scaler.pkl")
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of ModelBundles keyed by bundle directory.
+    A bundle is unpickled once and shared by every later call; a retrained
+    bundle (a new current.json, or a new manifest mtime/size for a flat
+    bundle directory) is picked up on the next lookup without a restart. Directories without a manifest fall back to the legacy
+    calorie_model.pkl/scaler.pkl pair next to them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # bundle_dir -> (stamp, bundle)
+
+    @staticmethod
+    def _stamp(bundle_dir):
+        pointer = os.path.join(bundle_dir, POINTER_NAME)
+        if os.path.exists(pointer):
+            # os.replace() gives every new pointer a new inode
+            st = os.stat(pointer)
+            return st.st_ino, st.st_mtime_ns
+        manifest = os.path.join(bundle_dir, MANIFEST_NAME)
+        if os.path.exists(manifest):
+            return _file_stamp(manifest)
+        model_path, scaler_path = _legacy_paths(bundle_dir)
+        return _file_stamp(model_path), _file_stamp(scaler_path)
+
+    def get(self, bundle_dir=BUNDLE_DIR):
+        bundle_dir = _resolve_artifact(bundle_dir, BUNDLE_DIR)
+        stamp = self._stamp(bundle_dir)
+
+        entry = self._entries.get(bundle_dir)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        with self._lock:
+            # Another thread may have finished the (re)load while we waited
+            entry = self._entries.get(bundle_dir)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+
+            active_dir = active_bundle_dir(bundle_dir)
+            if os.path.exists(os.path.join(active_dir, MANIFEST_NAME)):
+                print(f"📁 Loading model bundle from: {active_dir}")
+                bundle = load_bundle(active_dir)
+            else:
+                model_path, scaler_path = _legacy_paths(bundle_dir)
+                print(f"📁 Loading legacy model from: {model_path}")
+                bundle = _load_legacy_bundle(model_path, scaler_path)
+            self._entries[bundle_dir] = (stamp, bundle)
+            return bundle
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_registry = ModelRegistry()
+
+
+def get_bundle(bundle_dir=BUNDLE_DIR):
+    """Return the shared ModelBundle, reloading only if the artifacts changed."""
+    return _registry.get(bundle_dir)
+
+
+def get_model_and_scaler(bundle_dir=BUNDLE_DIR):
+    """Return the shared (model, scaler) pair."""
+    bundle = get_bundle(bundle_dir)
+    return bundle.model, bundle.scaler
+
+
+def warm_up(bundle_dir=BUNDLE_DIR):
+    """Load artifacts ahead of the first request (called from diet.engine.warm_on_start())."""
+    get_bundle(bundle_dir)
 
-    # ✅ Prepare input
-    X = pd.DataFrame([input_dict])
-    X = pd.get_dummies(X, drop_first=True)
 
-    # ✅ Determine training columns robustly
-    training_columns = getattr(model, "feature_names_in_", None)
-    if training_columns is None:
-        # Fallback: reload the dataset to get the same columns used in training
-        if os.path.exists("fitnessdataset_augmented.xlsx"):
-            df = pd.read_excel("fitnessdataset_augmented.xlsx")
-        elif os.path.exists("fitnessdataset_augmented.csv"):
-            df = pd.read_csv("fitnessdataset_augmented.csv")
-        else:
-            raise FileNotFoundError("⚠️ Dataset not found for feature reconstruction.")
-
-        df = df.dropna(subset=["Current Calorie Intake"])
-        X_train = df.drop(columns=["Current Calorie Intake"])
-        X_train = pd.get_dummies(X_train, drop_first=True)
-        training_columns = X_train.columns
-
-    # ✅ Align columns safely
-    for col in training_columns:
-        if col not in X.columns:
-            X[col] = 0
-    X = X[training_columns]
-
-    # ✅ Scale + predict
-    X_scaled = scaler.transform(X)
-    predicted = float(model.predict(X_scaled)[0])
-    return predicted
+def preload(bundle_dir=BUNDLE_DIR):
+    """
+    Load everything in a pre-fork master (gunicorn preload_app) and freeze
+    the heap. gc.freeze() moves all live objects to the permanent generation,
+    so the workers' collectors never write to those pages and they stay
+    shared copy-on-write instead of being duplicated per worker.
+    """
+    bundle = get_bundle(bundle_dir)
+    bundle.model  # materialize the lazy sklearn model before fork as well
+    gc.collect()
+    gc.freeze()
+    return bundle
+
+
+# =========================================================
+# Predict Calories (robust version)
+# =========================================================
+def predict_calories(input_dict, bundle_dir=BUNDLE_DIR):
+    """
+    Predict calorie needs based on user input features (a UserProfile or a
+    raw profile dict; the encoder reads the original fields via .get()).
+    Feature columns come from the bundle manifest, never from the dataset.
+    """
+    bundle = get_bundle(bundle_dir)
+    row = bundle.encoder.encode(input_dict)
+    return float(bundle.predict(row.reshape(1, -1))[0])
+
+
+def predict_calories_batch(input_dicts, bundle_dir=BUNDLE_DIR):
+    """
+    Predict calorie needs for many profiles at once.
+    All rows are encoded (already scaled) and predicted as one matrix in a
+    single forest pass. Returns a list of floats in input order.
+    """
+    input_dicts = list(input_dicts)
+    if not input_dicts:
+        return []
+
+    # ✅ Shared model + precompiled encoder (scaler folded in, no pandas)
+    bundle = get_bundle(bundle_dir)
+    X = bundle.encoder.encode_many(input_dicts)
+    return [float(p) for p in bundle.predict(X)]
 
 
 # =========================================================
 # Script Entrypoint (auto-trains if run directly)
 # =========================================================
 if __name__ == "__main__":
-    train_calorie_model("fitnessdataset_augmented.xlsx")
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Train the calorie model bundle.")
+    ap.add_argument("data_path", nargs="?", default="fitnessdataset_augmented.xlsx")
+    ap.add_argument("--force", action="store_true",
+                    help="retrain even if a bundle with the same fingerprint is stored")
+    ap.add_argument("--update", metavar="NEW_DATA",
+                    help="grow the active forest with trees fitted on NEW_DATA only")
+    ap.add_argument("--new-trees", type=int, default=50, help="trees to add with --update")
+    ap.add_argument("--max-trees", type=int, default=None,
+                    help="with --update, drop the oldest trees beyond this many")
+    ap.add_argument("--search", action="store_true",
+                    help="run the parallel hyperparameter search first (see model_search.py)")
+    ap.add_argument("--mode", choices=["grid", "random"], default="random")
+    ap.add_argument("--n-iter", type=int, default=12, help="candidates per family in random mode")
+    ap.add_argument("--cv", type=int, default=5)
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    ap.add_argument("--latency-budget-ms", type=float, default=1.0,
+                    help="pick the most accurate candidate under this single-row latency")
+    args = ap.parse_args()
+
+    if args.update:
+        update_calorie_model(args.update, n_new_trees=args.new_trees, max_trees=args.max_trees)
+    elif args.search:
+        from model_search import search_calorie_model
+        best = search_calorie_model(args.data_path, mode=args.mode, n_iter=args.n_iter,
+                                    cv=args.cv, n_jobs=args.jobs,
+                                    latency_budget_ms=args.latency_budget_ms)
+        train_calorie_model(args.data_path, estimator=best, force=args.force)
+    else:
+        train_calorie_model(args.data_path, force=args.force)
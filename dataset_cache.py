@@ -0,0 +1,193 @@
+# dataset_cache.py
+# ---------------------------------------------------------
+# Columnar cache for the training dataset.
+# The first load of an .xlsx/.csv converts it into one .npy file per column
+# (numeric columns as-is, text columns dictionary-encoded as int32 codes),
+# keyed by the source file's sha256. Later loads memory-map the arrays
+# instead of re-parsing the spreadsheet with openpyxl.
+# ---------------------------------------------------------
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = ".dataset_cache"
+CACHE_FORMAT_VERSION = 1
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_source(path):
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def _cache_root(data_path, cache_dir):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(data_path)), CACHE_DIR)
+    return cache_dir
+
+
+# -------------------------
+# Write
+# -------------------------
+def _write_cache(df, target_dir, source_sha256, source_name):
+    """Write columns to a temp dir and rename it into place (atomic for readers)."""
+    tmp_dir = f"{target_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        s = df[name]
+        fname = f"col{i:03d}.npy"
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            np.save(os.path.join(tmp_dir, fname), s.to_numpy())
+            columns.append({"name": str(name), "kind": "numeric", "file": fname})
+        else:
+            codes, uniques = pd.factorize(s, sort=True)
+            np.save(os.path.join(tmp_dir, fname), codes.astype(np.int32))
+            columns.append({"name": str(name), "kind": "text", "file": fname,
+                            "categories": [str(u) for u in uniques]})
+
+    meta = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "source": source_name,
+        "source_sha256": source_sha256,
+        "n_rows": int(len(df)),
+        "columns": columns,
+    }
+    with open(os.path.join(tmp_dir, "columns.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    try:
+        os.rename(tmp_dir, target_dir)
+    except OSError:
+        # Another process won the race; its copy is identical
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _prune_stale(root, prefix, keep):
+    """Drop caches of older versions of the same source file."""
+    for entry in os.listdir(root):
+        if entry.startswith(prefix) and entry != keep and ".tmp-" not in entry:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+# -------------------------
+# Read
+# -------------------------
+def _read_cache(target_dir, mmap_mode="r"):
+    with open(os.path.join(target_dir, "columns.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != CACHE_FORMAT_VERSION:
+        return None
+
+    data = {}
+    for col in meta["columns"]:
+        arr = np.load(os.path.join(target_dir, col["file"]), mmap_mode=mmap_mode)
+        if col["kind"] == "numeric":
+            data[col["name"]] = arr
+        else:
+            cats = np.asarray(col["categories"] + [np.nan], dtype=object)
+            # code -1 (missing) indexes the trailing NaN
+            data[col["name"]] = pd.Series(cats[np.asarray(arr)])
+    return pd.DataFrame(data)
+
+
+def load_dataset(data_path, cache_dir=None, use_cache=True):
+    """
+    Load the dataset as a DataFrame, through the columnar cache.
+    The cache is keyed by the source file's sha256, so editing or replacing
+    the spreadsheet transparently rebuilds it.
+    """
+    if not use_cache:
+        return _read_source(data_path)
+
+    root = _cache_root(data_path, cache_dir)
+    source_name = os.path.basename(data_path)
+    digest = _sha256(data_path)
+    prefix = f"{source_name}-"
+    target_dir = os.path.join(root, f"{prefix}{digest[:16]}")
+
+    if os.path.exists(os.path.join(target_dir, "columns.json")):
+        df = _read_cache(target_dir)
+        if df is not None:
+            return df
+        shutil.rmtree(target_dir, ignore_errors=True)
+
+    df = _read_source(data_path)
+    try:
+        os.makedirs(root, exist_ok=True)
+        _write_cache(df, target_dir, digest, source_name)
+        _prune_stale(root, prefix, os.path.basename(target_dir))
+        print(f"🗂️ Cached {source_name} as columnar arrays in {target_dir}")
+    except OSError as e:
+        # A read-only checkout still works, it just re-parses every time
+        print(f"⚠️ Could not write dataset cache: {e}")
+    return df
+
+
+# =========================================================
+# Benchmark: spreadsheet parse vs columnar cache
+# =========================================================
+def benchmark(data_path="fitnessdataset_augmented.xlsx", scale=1, repeat=3):
+    """
+    Time read_excel/read_csv against a warm cache load. With scale > 1 the
+    dataset is first replicated scale× into a temporary file of the same type.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = data_path
+        if scale > 1:
+            df = pd.concat([_read_source(data_path)] * scale, ignore_index=True)
+            path = os.path.join(tmp, f"scaled_x{scale}" + os.path.splitext(data_path)[1])
+            if path.endswith(".xlsx"):
+                df.to_excel(path, index=False)
+            else:
+                df.to_csv(path, index=False)
+
+        cache_dir = os.path.join(tmp, CACHE_DIR)
+
+        t = time.perf_counter()
+        for _ in range(repeat):
+            ref = _read_source(path)
+        parse_s = (time.perf_counter() - t) / repeat
+
+        load_dataset(path, cache_dir=cache_dir)  # cold: parse + write cache
+        t = time.perf_counter()
+        for _ in range(repeat):
+            cached = load_dataset(path, cache_dir=cache_dir)
+        cache_s = (time.perf_counter() - t) / repeat
+
+    same = ref.reset_index(drop=True).equals(cached)
+    print(f"📊 {len(ref)} rows | parse {parse_s * 1000:.1f} ms | cache {cache_s * 1000:.1f} ms "
+          f"| {parse_s / max(cache_s, 1e-9):.0f}× faster | identical={same}")
+    return {"rows": len(ref), "parse_s": parse_s, "cache_s": cache_s, "identical": same}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Build or benchmark the columnar dataset cache.")
+    ap.add_argument("data_path", nargs="?", default="fitnessdataset_augmented.xlsx")
+    ap.add_argument("--bench", action="store_true", help="compare spreadsheet parse vs cache load")
+    ap.add_argument("--scale", type=int, default=1, help="replicate the dataset N× for --bench")
+    args = ap.parse_args()
+
+    if args.bench:
+        benchmark(args.data_path, scale=args.scale)
+    else:
+        load_dataset(args.data_path)
@@ -0,0 +1,139 @@
+# feature_encoder.py
+# ---------------------------------------------------------
+# Precompiled profile → model-row encoder.
+# Compiled once at training time from the one-hot layout and the fitted
+# StandardScaler, then stored in the model bundle manifest.
+# Encoding a profile is a handful of dict lookups into a preallocated
+# float64 row that is already scaled — no pandas on the inference path.
+# ---------------------------------------------------------
+import numpy as np
+
+
+class FeatureEncoder:
+    """
+    Maps profile dicts straight to scaled model rows.
+
+    numeric_index: {column: position} for numeric features
+    onehot_index:  {column: {category: position}} for one-hot features
+    mean / scale:  the StandardScaler statistics, in feature order
+    """
+
+    def __init__(self, feature_columns, numeric_index, onehot_index, mean, scale):
+        self.feature_columns = list(feature_columns)
+        self.numeric_index = dict(numeric_index)
+        self.onehot_index = {c: dict(v) for c, v in onehot_index.items()}
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+        # Scaling folded in: an all-zero raw row scales to -mean/scale,
+        # a hot one-hot slot to (1 - mean)/scale.
+        inv_scale = 1.0 / self.scale
+        self._inv_scale = inv_scale
+        self._base = -self.mean * inv_scale
+        self._hot = (1.0 - self.mean) * inv_scale
+        self._numeric = [(c, i, self.mean[i], inv_scale[i]) for c, i in self.numeric_index.items()]
+        self._onehot = [(c, idx) for c, idx in self.onehot_index.items()]
+
+    @property
+    def n_features(self):
+        return len(self.feature_columns)
+
+    # -------------------------
+    # Construction
+    # -------------------------
+    @classmethod
+    def from_schema(cls, feature_columns, categories, scaler):
+        """
+        Compile from the ordered training columns, the category vocabularies
+        and a fitted StandardScaler. Without vocabularies (legacy artifacts),
+        "<column>_<category>" names are split on the first underscore.
+        """
+        feature_columns = [str(c) for c in feature_columns]
+        numeric_index, onehot_index = {}, {}
+        dummy_names = {}
+        for col, values in (categories or {}).items():
+            for v in values:
+                dummy_names[f"{col}_{v}"] = (col, v)
+
+        for i, name in enumerate(feature_columns):
+            if name in dummy_names:
+                col, v = dummy_names[name]
+            elif not categories and "_" in name:
+                col, v = name.split("_", 1)
+            else:
+                numeric_index[name] = i
+                continue
+            onehot_index.setdefault(col, {})[v] = i
+
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        if mean is None:
+            mean = np.zeros(len(feature_columns))
+        if scale is None:
+            scale = np.ones(len(feature_columns))
+        return cls(feature_columns, numeric_index, onehot_index, mean, scale)
+
+    def to_dict(self):
+        return {
+            "numeric_index": self.numeric_index,
+            "onehot_index": self.onehot_index,
+            "mean": [float(x) for x in self.mean],
+            "scale": [float(x) for x in self.scale],
+        }
+
+    @classmethod
+    def from_dict(cls, feature_columns, payload):
+        return cls(feature_columns, payload["numeric_index"], payload["onehot_index"],
+                   payload["mean"], payload["scale"])
+
+    # -------------------------
+    # Encoding
+    # -------------------------
+    def encode(self, profile, out=None):
+        """Encode one profile dict into a scaled float64 row."""
+        if out is None:
+            row = self._base.copy()
+        else:
+            row = out
+            row[:] = self._base
+        for col, i, mu, inv in self._numeric:
+            x = _as_float(profile.get(col))
+            if x is not None:
+                row[i] = (x - mu) * inv
+        for col, idx in self._onehot:
+            v = profile.get(col)
+            if v is not None:
+                i = idx.get(str(v))
+                if i is not None:
+                    row[i] = self._hot[i]
+        return row
+
+    def encode_many(self, profiles):
+        """Encode a list of profile dicts into an (n, n_features) matrix, column by column."""
+        n = len(profiles)
+        X = np.empty((n, self.n_features), dtype=np.float64)
+        X[:] = self._base
+        for col, i, mu, inv in self._numeric:
+            vals = np.array([_as_float(p.get(col)) for p in profiles], dtype=np.float64)
+            present = ~np.isnan(vals)
+            X[present, i] = (vals[present] - mu) * inv
+        rows = np.arange(n)
+        for col, idx in self._onehot:
+            cols = np.fromiter(
+                (idx.get(str(v), -1) if (v := p.get(col)) is not None else -1 for p in profiles),
+                dtype=np.intp, count=n,
+            )
+            hit = cols >= 0
+            X[rows[hit], cols[hit]] = self._hot[cols[hit]]
+        return X
+
+
+def _as_float(x):
+    """Numeric features: None/blank/unparseable count as missing (encoded like a 0 raw value)."""
+    if x is None or x == "":
+        return None
+    try:
+        x = float(x)
+    except (TypeError, ValueError):
+        return None
+    return None if x != x else x
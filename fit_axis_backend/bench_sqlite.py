@@ -0,0 +1,126 @@
+# bench_sqlite.py — DietPlan write/read throughput under concurrent workers,
+# plain SQLite vs the tuned setup in settings (WAL + PRAGMAs, IMMEDIATE
+# transactions, persistent connections).
+#
+#   python bench_sqlite.py --writers 4 --readers 4 --seconds 5
+#
+# "baseline": rollback journal, default PRAGMAs, a new connection per request.
+# "tuned":    settings.SQLITE_PRAGMAS, transaction_mode IMMEDIATE, CONN_MAX_AGE.
+# Each mode runs against a fresh temporary database seeded with --rows plans.
+# Every operation is one simulated request: one query, then the end-of-request
+# connection handling (close_old_connections).
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import django
+import numpy as np
+
+FOODS = ("Vegetarian", "Non-Vegetarian")
+ALLERGIES = ("None", "Dairy", "Gluten")
+
+
+def _setup(mode, db_path):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fitaxis_backend.settings")
+    from fitaxis_backend import settings as conf
+
+    conf.ML_WARMUP_ON_START = False
+    conf.DATABASES = {"default": dict(conf.DATABASES["default"], NAME=db_path)}
+    if mode == "baseline":
+        conf.DATABASES["default"].update(CONN_MAX_AGE=0, OPTIONS={})
+        conf.SQLITE_PRAGMAS = {}
+    django.setup()
+
+
+def _worker(role, seconds, seed, out):
+    from django.db import OperationalError, close_old_connections
+    from diet.models import DietPlan
+
+    rng = np.random.default_rng(seed)
+    lat, errors = [], 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        food, allergy = FOODS[rng.integers(2)], ALLERGIES[rng.integers(3)]
+        t = time.perf_counter()
+        try:
+            if role == "write":
+                DietPlan.objects.create(food_preference=food, calories=int(rng.integers(1200, 3500)),
+                                        allergy=allergy, plan="x" * 400)
+            else:
+                list(DietPlan.objects.filter(food_preference=food, allergy=allergy)
+                     .order_by("-created_at")[:50])
+            lat.append(time.perf_counter() - t)
+        except OperationalError:
+            errors += 1
+        close_old_connections()
+    out.put((role, lat, errors))
+
+
+def _run_mode(mode, writers, readers, seconds, rows, result):
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(mode, os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+        from django.db import connections
+        from diet.models import DietPlan
+
+        call_command("migrate", verbosity=0)
+        rng = np.random.default_rng(0)
+        DietPlan.objects.bulk_create(
+            [DietPlan(food_preference=FOODS[i % 2], calories=int(rng.integers(1200, 3500)),
+                      allergy=ALLERGIES[i % 3], plan="x" * 400) for i in range(rows)],
+            batch_size=1000)
+        connections.close_all()  # never share a connection across fork
+
+        ctx = mp.get_context("fork")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(role, seconds, i, out))
+                 for i, role in enumerate(["write"] * writers + ["read"] * readers)]
+        for p in procs:
+            p.start()
+        stats = {"write": ([], 0), "read": ([], 0)}
+        for _ in procs:
+            role, lat, errors = out.get()
+            stats[role] = (stats[role][0] + lat, stats[role][1] + errors)
+        for p in procs:
+            p.join()
+
+    report = {}
+    for role, (lat, errors) in stats.items():
+        ms = np.array(lat or [0.0]) * 1000
+        report[role] = {"ops_s": len(lat) / seconds, "p50_ms": float(np.median(ms)),
+                        "p99_ms": float(np.percentile(ms, 99)), "errors": errors}
+    result.put(report)
+
+
+def run(mode, writers, readers, seconds, rows):
+    # Each mode gets a fresh process so Django is configured from scratch
+    ctx = mp.get_context("fork")
+    result = ctx.Queue()
+    p = ctx.Process(target=_run_mode, args=(mode, writers, readers, seconds, rows, result))
+    p.start()
+    report = result.get()
+    p.join()
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SQLite throughput: plain vs tuned settings.")
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--rows", type=int, default=20000, help="plans seeded before the run")
+    args = ap.parse_args()
+
+    print(f"🗄️  {args.writers} writers + {args.readers} readers, {args.seconds:.0f} s per mode, "
+          f"{args.rows} seeded rows")
+    print(f"{'mode':<10}{'role':<7}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode in ("baseline", "tuned"):
+        for role, r in run(mode, args.writers, args.readers, args.seconds, args.rows).items():
+            print(f"{mode:<10}{role:<7}{r['ops_s']:>10.0f}{r['p50_ms']:>10.2f}"
+                  f"{r['p99_ms']:>10.2f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
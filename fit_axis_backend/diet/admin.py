@@ -6,4 +6,6 @@ class DietPlanAdmin(admin.ModelAdmin):
     list_display = ('food_preference', 'calories', 'allergy', 'created_at')
     list_filter = ('food_preference', 'allergy', 'created_at')
     search_fields = ('food_preference', 'allergy')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+    # Skip the unfiltered COUNT(*) over the whole table on every changelist page
+    show_full_result_count = False
\ No newline at end of file
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class DietConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'diet'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .sqlite import configure_sqlite
+        connection_created.connect(configure_sqlite, dispatch_uid='diet.configure_sqlite')
+        # The ML engines are warmed by the WSGI/ASGI entry points
+        # (diet.engine.warm_on_start), not here: ready() also runs for every
+        # management command.
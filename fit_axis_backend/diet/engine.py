@@ -0,0 +1,133 @@
+"""
+In-process plan engine behind the generate_plan/ endpoint.
+
+Everything expensive (model bundle, filtered meal pools, slot combination
+tables) is built once per process by warm_on_start(), called from the
+WSGI/ASGI entry points; with gunicorn's preload_app that happens in the
+master and is shared by every worker. A request then only runs the per-profile
+stages, each one timed.
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import namedtuple
+from datetime import date
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Part of every plan ETag: bump when the planner or the meal data change so
+# clients stop revalidating plans the new code would no longer produce.
+PLAN_ETAG_VERSION = 1
+
+PlanResult = namedtuple('PlanResult', ['plan', 'calorie_target', 'predicted_calories', 'timings'])
+
+
+def warm_engines():
+    """Load the calorie model and precompute every meal pool and combination table."""
+    from calorie_model import warm_up
+    from recommendation import precompute_pools
+
+    t = time.perf_counter()
+    warm_up()
+    pools = precompute_pools(combos=True)
+    logger.info("Plan engines warm: %d meal pools in %.0f ms", pools, (time.perf_counter() - t) * 1000)
+
+
+def warm_on_start():
+    """
+    warm_engines() for a serving process, if ML_WARMUP_ON_START, then start
+    the executor workers if ML_PRESTART_EXECUTORS (failures are logged, not raised).
+    """
+    if not getattr(settings, 'ML_WARMUP_ON_START', True):
+        return
+    try:
+        warm_engines()
+    except Exception as e:
+        logger.warning("Plan engine warm-up skipped: %s", e)
+    if getattr(settings, 'ML_PRESTART_EXECUTORS', True):
+        from .executors import prestart_executors
+        try:
+            prestart_executors()
+        except Exception as e:
+            logger.warning("Executor prestart skipped: %s", e)
+
+
+class _Stopwatch:
+    def __init__(self):
+        self.start = self._last = time.perf_counter()
+        self.timings = {}
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self._last) * 1000, 3)
+        self._last = now
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+
+def build_plan(profile_data, current_calories=None, day=None, budget_ms=None):
+    """
+    Predict → goal-adjust → fuzzy → plan for one profile.
+    `current_calories` skips the model (like typing an intake in predict.py).
+    The plan solver gets whatever is left of `budget_ms`
+    (settings.ML_PLAN_BUDGET_MS by default) after the earlier stages.
+    """
+    from calorie_model import predict_calories
+    from fuzzy import compute_fuzzy_factors
+    from recommendation import generate_daily_plan, goal_calorie_target
+    from user_profile import UserProfile
+
+    if budget_ms is None:
+        budget_ms = getattr(settings, 'ML_PLAN_BUDGET_MS', 50.0)
+    watch = _Stopwatch()
+
+    profile = UserProfile.of(profile_data)
+    watch.lap('profile')
+
+    predicted = None
+    if current_calories is None:
+        predicted = current_calories = predict_calories(profile)
+        watch.lap('predict')
+    calorie_target = goal_calorie_target(float(current_calories), profile.goal)
+
+    fuzzy = compute_fuzzy_factors(profile, calorie_target)
+    watch.lap('fuzzy')
+
+    remaining_ms = max(budget_ms - watch.elapsed_ms(), 0.0)
+    plan = generate_daily_plan(profile, calorie_target, day=day, fuzzy=fuzzy, budget_ms=remaining_ms)
+    watch.lap('plan')
+
+    watch.timings['total'] = round(watch.elapsed_ms(), 3)
+    if watch.timings['total'] > budget_ms:
+        logger.warning("Plan over budget: %.1f ms > %.1f ms %s", watch.timings['total'], budget_ms, watch.timings)
+    return PlanResult(plan, calorie_target, predicted, watch.timings)
+
+
+def plan_etag(profile_data, current_calories=None, day=None):
+    """
+    ETag of build_plan(profile_data, current_calories, day), known before the
+    plan is built: the plan_seed for a given intake, or the profile digest
+    plus the model bundle version when the intake is predicted. Weak, since a
+    plan that runs out of budget may come from the greedy solver instead.
+    """
+    from calorie_model import get_bundle
+    from recommendation import goal_calorie_target, plan_seed
+    from user_profile import UserProfile
+
+    profile = UserProfile.of(profile_data)
+    day = str(day or date.today())
+    if current_calories is None:
+        key = [profile.digest, get_bundle().metadata.get('version'), day]
+    else:
+        key = [plan_seed(profile, goal_calorie_target(float(current_calories), profile.goal), day)]
+    blob = json.dumps([PLAN_ETAG_VERSION] + key).encode('utf-8')
+    return 'W/"' + hashlib.sha256(blob).hexdigest()[:32] + '"'
+
+
+def server_timing(timings):
+    """Server-Timing header value for a stage → ms mapping."""
+    return ', '.join(f'{stage};dur={ms}' for stage, ms in timings.items())
@@ -0,0 +1,197 @@
+"""
+Bounded executors for CPU-bound ML work called from async views.
+
+Each lane (settings.ML_EXECUTORS) has its own pool and its own cap on
+running + queued tasks, so a burst of slow batch predictions can only fill
+the batch lane and interactive plan requests keep their workers. When a
+lane is full, submit fails immediately with Overloaded (the views answer
+503 + Retry-After) instead of queueing without bound.
+
+kind "thread" suits the NumPy paths (the forest releases the GIL while it
+walks arrays). kind "process" suits GIL-bound pure-Python work (plan
+assembly); its workers come from a forkserver (forking the threaded server
+itself could copy a held lock into the child) and warm their engines once
+on start. warm_on_start() starts them up front via prestart_executors(). A
+pool that breaks (a worker crashed or was killed) is replaced on the next
+call, so only the requests it was running fail (views answer 503).
+"""
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXECUTORS = {
+    'plan': {'kind': 'process', 'workers': 2, 'max_pending': 32},
+    'batch': {'kind': 'thread', 'workers': 1, 'max_pending': 2},
+}
+
+
+class Overloaded(Exception):
+    """Raised when a lane already has max_pending tasks running or queued."""
+
+
+def _mp_context():
+    # forkserver where the platform has it (Linux, macOS), spawn elsewhere.
+    # The forkserver imports the ML modules once, so each worker only loads data.
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['django', 'numpy', 'calorie_model', 'recommendation'])
+    return context
+
+
+def _warm_worker():
+    # A fresh interpreter: set Django up (DJANGO_SETTINGS_MODULE is inherited)
+    # before anything reads settings. An initializer that raises breaks the
+    # whole pool, so a worker that can't warm up just starts cold (requests
+    # with current_calories still work).
+    try:
+        import django
+        django.setup()
+        from .engine import warm_engines
+        warm_engines()
+    except Exception as e:
+        logger.warning("Executor worker warm-up skipped: %s", e)
+
+
+def _ready():
+    return os.getpid()
+
+
+class BoundedExecutor:
+    def __init__(self, name, kind='thread', workers=1, max_pending=8):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor kind {kind!r} (expected 'thread' or 'process')")
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = self._new_pool()
+        # A threading (not asyncio) semaphore: under WSGI every async view
+        # runs on its own event loop, so the cap must hold across loops.
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _new_pool(self):
+        if self.kind == 'process':
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context(),
+                                       initializer=_warm_worker)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f'ml-{self.name}')
+
+    def _replace_broken(self, pool):
+        """Swap in a fresh pool if `pool` is still the current (broken) one."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = self._new_pool()
+            self.restarts += 1
+        logger.error("Executor lane %r was broken (worker died); started a new pool", self.name)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, _future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in the pool and await it; raises Overloaded when the lane is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(self.name)
+        with self._lock:
+            self.pending += 1
+        pool = self._pool
+        try:
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenExecutor:
+                self._replace_broken(pool)
+                pool = self._pool
+                future = pool.submit(fn, *args)
+        except BaseException:
+            self._done(None)
+            raise
+        # The slot is freed when the work finishes, not when the client goes
+        # away, so cancelled requests still count until their task ends.
+        future.add_done_callback(self._done)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenExecutor:
+            self._replace_broken(pool)
+            raise
+
+    def prestart(self):
+        """Start (and warm) every process worker now rather than on the first requests."""
+        if self.kind != 'process':
+            return
+        # Each submit to a pool without an idle worker starts one more process.
+        futures = [self._pool.submit(_ready) for _ in range(self.workers)]
+        for future in futures:
+            future.result()  # BrokenExecutor if a worker died on start
+
+    def stats(self):
+        with self._lock:
+            return {'kind': self.kind, 'pending': self.pending, 'max_pending': self.max_pending,
+                    'completed': self.completed, 'rejected': self.rejected, 'restarts': self.restarts}
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(lane):
+    """The process-wide executor for a lane, created on first use or by prestart_executors()."""
+    executor = _executors.get(lane)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(lane)
+            if executor is None:
+                config = dict(DEFAULT_EXECUTORS.get(lane, {}))
+                config.update(getattr(settings, 'ML_EXECUTORS', {}).get(lane, {}))
+                executor = _executors[lane] = BoundedExecutor(lane, **config)
+    return executor
+
+
+def prestart_executors():
+    """Create every configured lane and start its process workers (see BoundedExecutor.prestart)."""
+    lanes = dict(DEFAULT_EXECUTORS, **getattr(settings, 'ML_EXECUTORS', {}))
+    for lane in lanes:
+        get_executor(lane).prestart()
+
+
+def _forget_executors():
+    # A forked child can't use its parent's pools (their manager threads
+    # didn't survive the fork); it creates its own on first use.
+    global _executors_lock
+    _executors.clear()
+    _executors_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):  # POSIX only
+    os.register_at_fork(after_in_child=_forget_executors)
+
+
+def executor_stats():
+    return {lane: executor.stats() for lane, executor in list(_executors.items())}
+
+
+@atexit.register
+def shutdown_executors():
+    for lane in list(_executors):
+        _executors.pop(lane).shutdown()
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:21
+
+import json
+import re
+
+from django.db import migrations, models
+
+# Self-contained copies of the plan text format (migrations must not depend
+# on app code that can change later).
+_HEADER = "Here is your personalized diet plan:\n\n"
+_MEAL_LINE = re.compile(r'^(?P<meal>[^:]+): (?P<name>.+) \((?P<calories>\d+) kcal\)$')
+_TOTAL_LINE = re.compile(r'^Total: ~(?P<calories>\d+) kcal$')
+# Stored plans all came from the generate_diet templates: one serving per item
+_QTY = '1 serving'
+BATCH = 2000
+
+
+def _structure(text):
+    body = text[len(_HEADER):] if text.startswith(_HEADER) else text
+    body = body.split("\n\nFood Preference: ", 1)[0]
+    plan = {'meals': [], 'total_calories': None, 'notes': []}
+    for line in filter(None, body.split("\n")):
+        if m := _MEAL_LINE.match(line):
+            plan['meals'].append({'meal': m['meal'], 'items': [
+                {'name': m['name'], 'qty': _QTY, 'calories': int(m['calories'])}]})
+        elif m := _TOTAL_LINE.match(line):
+            plan['total_calories'] = int(m['calories'])
+        else:
+            plan['notes'].append(line.removeprefix('Note: '))
+    return plan
+
+
+def _render(plan, row):
+    lines = [f"{meal['meal']}: {item['name']} ({item['calories']} kcal)"
+             for meal in plan.get('meals', []) for item in meal.get('items', [])]
+    if plan.get('total_calories') is not None:
+        lines.append(f"Total: ~{plan['total_calories']} kcal")
+    lines += [f"Note: {note}" for note in plan.get('notes', [])]
+    return (_HEADER + "\n".join(lines) + f"\n\nFood Preference: {row.food_preference}"
+            f"\nCalories: {row.calories} kcal\nAllergy: {row.allergy}")
+
+
+def _rewrite(apps, convert):
+    DietPlan = apps.get_model('diet', 'DietPlan')
+    batch = []
+    rows = DietPlan.objects.only('id', 'plan', 'food_preference', 'calories', 'allergy')
+    for row in rows.order_by('pk').iterator(chunk_size=BATCH):
+        row.plan = convert(row.plan, row)
+        batch.append(row)
+        if len(batch) >= BATCH:
+            DietPlan.objects.bulk_update(batch, ['plan'])
+            batch = []
+    if batch:
+        DietPlan.objects.bulk_update(batch, ['plan'])
+
+
+def text_to_json(apps, schema_editor):
+    """Pre-rendered plan text → JSON document (the same shape views.structure_plan stores)."""
+    def convert(text, row):
+        try:
+            json.loads(text)
+            return text
+        except ValueError:
+            return json.dumps(_structure(text or ''))
+    _rewrite(apps, convert)
+
+
+def json_to_text(apps, schema_editor):
+    """JSON document → the text generate_diet/ used to store, rebuilt from the plan and its row."""
+    def convert(value, row):
+        plan = json.loads(value) if isinstance(value, str) else value
+        if isinstance(plan, dict) and 'meals' in plan:
+            return _render(plan, row)
+        return json.dumps(plan)
+    _rewrite(apps, convert)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diet', '0001_initial'),
+    ]
+
+    operations = [
+        # Still a TextField here: rewrite every row as valid JSON first, so
+        # SQLite's json_valid() check passes when the table is rebuilt.
+        migrations.RunPython(text_to_json, json_to_text),
+        migrations.AlterField(
+            model_name='dietplan',
+            name='plan',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='dietplan',
+            index=models.Index(fields=['-created_at'], name='dietplan_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dietplan',
+            index=models.Index(fields=['food_preference', '-created_at'], name='dietplan_food_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dietplan',
+            index=models.Index(fields=['food_preference', 'allergy', '-created_at'], name='dietplan_food_allergy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dietplan',
+            index=models.Index(fields=['allergy', '-created_at'], name='dietplan_allergy_idx'),
+        ),
+    ]
@@ -5,8 +5,19 @@ class DietPlan(models.Model):
     food_preference = models.CharField(max_length=50)
     calories = models.IntegerField()
     allergy = models.CharField(max_length=50)
-    plan = models.TextField()
+    # {"meals": [{"meal", "items": [{"name", "qty", "calories"}]}], "total_calories", "notes"}
+    plan = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Match the history/admin access paths: newest first, optionally
+        # filtered by food preference and/or allergy.
+        indexes = [
+            models.Index(fields=['-created_at'], name='dietplan_created_idx'),
+            models.Index(fields=['food_preference', '-created_at'], name='dietplan_food_idx'),
+            models.Index(fields=['food_preference', 'allergy', '-created_at'], name='dietplan_food_allergy_idx'),
+            models.Index(fields=['allergy', '-created_at'], name='dietplan_allergy_idx'),
+        ]
     
     def __str__(self):
         return f"{self.food_preference} - {self.calories} kcal"
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""
+Per-connection SQLite tuning (connected in DietConfig.ready()).
+
+Every new SQLite connection runs the PRAGMAs in settings.SQLITE_PRAGMAS:
+WAL lets readers run alongside the single writer, synchronous=NORMAL
+fsyncs at checkpoints instead of every commit (safe with WAL), and
+busy_timeout makes a writer wait for the lock instead of failing with
+"database is locked". With CONN_MAX_AGE the connection, and therefore this
+setup, is reused across requests.
+"""
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    from django.conf import settings
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
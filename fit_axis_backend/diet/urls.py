@@ -2,5 +2,8 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('', views.generate_diet, name='generate_diet'),
+    path('generate_diet/', views.generate_diet, name='generate_diet'),
+    path('predict_calories_batch/', views.predict_calories_batch, name='predict_calories_batch'),
+    path('generate_plan/', views.generate_plan, name='generate_plan'),
+    path('ml_stats/', views.ml_stats, name='ml_stats'),
 ]
\ No newline at end of file
@@ -1,10 +1,26 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_http_methods, require_POST
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from . import write_behind
+from .executors import Overloaded, executor_stats, get_executor
 from .models import DietPlan
-from .serializers import DietPlanSerializer
+from concurrent.futures import BrokenExecutor
+from datetime import date
+from functools import lru_cache
 import json
+import logging
+import math
+import re
+import time
+
+logger = logging.getLogger(__name__)
 
 @api_view(['POST'])
 def generate_diet(request):
@@ -15,28 +31,204 @@ def generate_diet(request):
             calories = request.data.get('calories', 0)
             allergy = request.data.get('allergy', '')
             
+            # Validate before anything is saved or queued: coerces calories to
+            # an int and range-checks it (a queued row the database rejects
+            # would otherwise fail its whole write-behind batch).
+            calories = DietPlan._meta.get_field('calories').clean(calories, None)
+            
             # Generate a diet plan based on the inputs
             plan = generate_diet_plan(food, calories, allergy)
             
-            # Save to database
-            diet_plan = DietPlan.objects.create(
+            # Save to database (queued for a batched write when write-behind is on)
+            diet_plan = DietPlan(
                 food_preference=food,
                 calories=calories,
                 allergy=allergy,
                 plan=plan
             )
+            if write_behind.enabled():
+                write_behind.get_queue().put(diet_plan)
+            else:
+                diet_plan.save()
             
-            # Serialize and return response
-            serializer = DietPlanSerializer(diet_plan)
-            return Response({'plan': plan}, status=status.HTTP_200_OK)
+            return Response({'plan': render_plan_text(plan, food, calories, allergy)},
+                            status=status.HTTP_200_OK)
             
+        except ValidationError as e:
+            return Response({'error': {'calories': e.messages}}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+def ml_stats(request):
+    """Executor lane and write-behind queue counters for this worker process."""
+    return Response({
+        'executors': executor_stats(),
+        'write_behind': write_behind.write_behind_stats(),
+    })
+
+# =========================================================
+# Async ML views
+# =========================================================
+# Plain Django async views (DRF's @api_view is sync-only): parsing and the
+# response stay on the event loop, the CPU work runs in a bounded executor
+# lane (see executors.py) and a full lane answers 503 right away.
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'null')
+    except ValueError:
+        return None
+
+
+def _error(message, code=status.HTTP_400_BAD_REQUEST):
+    return JsonResponse({'error': message}, status=code)
+
+
+def _overloaded(lane):
+    response = _error(f'Server busy ({lane} queue full), retry shortly.', status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _unavailable(lane):
+    response = _error(f'Server error ({lane} workers restarting), retry shortly.', status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _server_error(lane, e):
+    logger.exception("%s lane request failed", lane)
+    return _error(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_POST
+async def predict_calories_batch(request):
+    """
+    Predict calorie needs for a JSON array of profiles in one model pass.
+    Accepts either a bare array or {"profiles": [...]}.
+    """
+    from calorie_model import predict_calories_batch as _predict_batch
+
+    profiles = _json_body(request)
+    if isinstance(profiles, dict):
+        profiles = profiles.get('profiles')
+    if not isinstance(profiles, list) or not all(isinstance(p, dict) for p in profiles):
+        return _error('Expected a JSON array of profile objects.')
+
+    max_batch = getattr(settings, 'ML_MAX_BATCH_SIZE', 10000)
+    if len(profiles) > max_batch:
+        return _error(f'Batch too large (max {max_batch} profiles).')
+
+    try:
+        predictions = await get_executor('batch').run(_predict_batch, profiles)
+    except Overloaded:
+        return _overloaded('batch')
+    except BrokenExecutor:
+        return _unavailable('batch')
+    except Exception as e:
+        return _server_error('batch', e)
+    return JsonResponse({'predictions': predictions})
+
+
+def _query_plan_request(query):
+    """GET form of a generate_plan body: profile fields as query parameters."""
+    profile = {key: values if len(values) > 1 else values[0]
+               for key, values in query.lists() if key not in ('current_calories', 'day')}
+    return {'profile': profile, 'current_calories': query.get('current_calories'), 'day': query.get('day')}
+
+
+def _intake_calories(value):
+    """
+    current_calories as a finite kcal figure within ML_INTAKE_KCAL_RANGE.
+    The rounded value also goes through the DietPlan calories validator.
+    """
+    value = float(value)
+    low, high = getattr(settings, 'ML_INTAKE_KCAL_RANGE', (800, 10000))
+    if not (math.isfinite(value) and low <= value <= high):
+        raise ValueError(value)
+    DietPlan._meta.get_field('calories').clean(round(value), None)
+    return value
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+async def generate_plan(request):
+    """
+    Full ML-backed daily plan for one profile.
+    POST body: {"profile": {...}, "current_calories": optional, "day": optional}
+    (a bare profile object also works); GET takes the profile fields,
+    current_calories and day as query parameters and honours If-None-Match:
+    the ETag is derived from the plan's seed inputs, so a match answers 304
+    without building the plan. Without current_calories the intake is
+    predicted by the calorie model. Per-stage timings (plus the time spent
+    waiting for an executor worker) are returned in the body and in the
+    Server-Timing header.
+    """
+    from .engine import build_plan, plan_etag, server_timing
+
+    data = _query_plan_request(request.GET) if request.method == 'GET' else _json_body(request)
+    if not isinstance(data, dict):
+        return _error('Expected a JSON object.')
+    profile = data.get('profile', data)
+    if not isinstance(profile, dict):
+        return _error('"profile" must be an object.')
+
+    current = data.get('current_calories')
+    if current is not None:
+        try:
+            current = _intake_calories(current)
+        except (TypeError, ValueError, ValidationError):
+            low, high = getattr(settings, 'ML_INTAKE_KCAL_RANGE', (800, 10000))
+            return _error(f'"current_calories" must be a number of kcal between {low} and {high}.')
+    # Pin the day now so the ETag and the plan agree across midnight
+    day = data.get('day')
+    try:
+        day = date.fromisoformat(day).isoformat() if day else date.today().isoformat()
+    except (TypeError, ValueError):
+        return _error('"day" must be an ISO date (YYYY-MM-DD).')
+
+    try:
+        etag = plan_etag(profile, current, day)
+    except Exception:
+        etag = None  # e.g. no model bundle; build_plan reports the real error
+    if etag is not None and request.method == 'GET':
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            not_modified['Cache-Control'] = 'private, no-cache'
+            return not_modified
+
+    budget_ms = getattr(settings, 'ML_PLAN_BUDGET_MS', 50.0)
+    start = time.perf_counter()
+    try:
+        result = await get_executor('plan').run(build_plan, profile, current, day, budget_ms)
+    except Overloaded:
+        return _overloaded('plan')
+    except BrokenExecutor:
+        return _unavailable('plan')
+    except Exception as e:
+        return _server_error('plan', e)
+    timings = dict(result.timings)
+    timings['wait'] = round(max((time.perf_counter() - start) * 1000 - timings['total'], 0.0), 3)
+
+    response = JsonResponse({
+        'calorie_target': result.calorie_target,
+        'predicted_calories': result.predicted_calories,
+        'plan': result.plan,
+        'timings_ms': timings,
+    })
+    if etag is not None:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+    response['Server-Timing'] = server_timing(timings)
+    return response
+
 def generate_diet_plan(food, calories, allergy):
     """
     Generate a diet plan based on food preference, calories, and allergies
     This is a simplified version - in a real app, this could use ML or more complex logic
+    Returns the structured plan (see structure_plan); render_plan_text formats it.
     """
     
     # Sample diet plans based on food preference
@@ -114,9 +306,58 @@ def generate_diet_plan(food, calories, allergy):
         plan = [meal for meal in plan if allergy.lower() not in meal.lower()]
         plan.append(f"Note: Please avoid {allergy} and substitute with alternatives.")
     
-    # Format the plan as a string
+    return structure_plan(plan)
+
+
+# =========================================================
+# Structured plans (what DietPlan.plan stores)
+# =========================================================
+# {"meals": [{"meal": "Breakfast", "items": [{"name", "qty", "calories"}]}, ...],
+#  "total_calories": 1850 or None, "notes": [...]}
+_MEAL_LINE = re.compile(r'^(?P<meal>[^:]+): (?P<name>.+) \((?P<calories>\d+) kcal\)$')
+_TOTAL_LINE = re.compile(r'^Total: ~(?P<calories>\d+) kcal$')
+# Every template item is one serving of the kcal it lists
+DEFAULT_QTY = '1 serving'
+
+
+@lru_cache(maxsize=1)
+def _catalog_servings():
+    """Lower-cased meal name → serving (base_qty) from the ML meal catalog."""
+    try:
+        from recommendation import MEAL_CATALOG
+    except ImportError:
+        return {}
+    return {name.lower(): qty for name, qty in zip(MEAL_CATALOG.names, MEAL_CATALOG.base_qty)}
+
+
+def serving_qty(name):
+    """The catalog serving for a meal name, else DEFAULT_QTY."""
+    return _catalog_servings().get(name.lower(), DEFAULT_QTY)
+
+
+def structure_plan(lines):
+    """Template lines ("Lunch: Grilled salmon (550 kcal)", "Total: ~1850 kcal", notes) → plan dict."""
+    plan = {'meals': [], 'total_calories': None, 'notes': []}
+    for line in lines:
+        if m := _MEAL_LINE.match(line):
+            plan['meals'].append({'meal': m['meal'], 'items': [
+                {'name': m['name'], 'qty': serving_qty(m['name']), 'calories': int(m['calories'])}]})
+        elif m := _TOTAL_LINE.match(line):
+            plan['total_calories'] = int(m['calories'])
+        else:
+            plan['notes'].append(line.removeprefix('Note: '))
+    return plan
+
+
+def render_plan_text(plan, food, calories, allergy):
+    """The text response generate_diet/ has always returned, rendered from a plan dict."""
+    lines = [f"{meal['meal']}: {item['name']} ({item['calories']} kcal)"
+             for meal in plan['meals'] for item in meal['items']]
+    if plan.get('total_calories') is not None:
+        lines.append(f"Total: ~{plan['total_calories']} kcal")
+    lines += [f"Note: {note}" for note in plan.get('notes', [])]
+
     plan_text = "Here is your personalized diet plan:\n\n"
-    plan_text += "\n".join(plan)
+    plan_text += "\n".join(lines)
     plan_text += f"\n\nFood Preference: {food}\nCalories: {calories} kcal\nAllergy: {allergy}"
-    
     return plan_text
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Write-behind persistence for DietPlan rows (opt-in: DIET_PLAN_WRITE_BEHIND).
+
+Views hand unsaved model instances to put() and return immediately. One
+background thread per process saves them with bulk_create in a single
+transaction whenever DIET_PLAN_WRITE_BEHIND_BATCH rows are waiting or
+DIET_PLAN_WRITE_BEHIND_FLUSH_MS has passed, so requests no longer queue on
+the SQLite write lock one INSERT at a time. A batch the database rejects
+is retried row by row, so only the offending rows are lost (counted as
+failed); views validate rows before put(). Any other error in a flush is
+logged and its rows counted as failed; the writer thread keeps running.
+The queue is bounded: when it is full (or already shut down) rows are
+dropped and counted, never blocked on. close() - registered with atexit
+and gunicorn's worker_exit - writes whatever is still queued.
+"""
+import atexit
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    def __init__(self, model, batch_size=100, flush_ms=200, max_queue=10000):
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_queue = max_queue
+        self._rows = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def put(self, obj):
+        """Queue one unsaved instance; returns False (and counts a drop) if the queue is full."""
+        with self._cond:
+            if self._closed or len(self._rows) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._rows.append(obj)
+            self.enqueued += 1
+            if self._thread is None:
+                # Started on first use, i.e. in the serving process after any fork
+                self._thread = threading.Thread(target=self._run, name='diet-write-behind', daemon=True)
+                self._thread.start()
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _take(self):
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._rows) >= self.batch_size,
+                                    timeout=self.flush_ms / 1000)
+                rows = self._take()
+                closing = self._closed
+            if rows:
+                try:
+                    self._write(rows)
+                except Exception:
+                    # Keep the thread alive: a dead writer would leave every
+                    # later row queued until it is dropped.
+                    logger.exception("Write-behind flush of %d %s rows lost",
+                                     len(rows), self.model.__name__)
+                    with self._cond:
+                        self.failed += len(rows)
+                        self.flushes += 1
+            if closing:
+                try:
+                    connection.close()
+                except Exception as e:
+                    logger.warning("Write-behind connection close failed: %s", e)
+                return
+
+    def _write(self, rows):
+        try:
+            close_old_connections()
+            with transaction.atomic():
+                self.model.objects.bulk_create(rows, batch_size=self.batch_size)
+            written = len(rows)
+        except Exception as e:
+            # One bad row must not cost the whole batch: retry them one by one
+            logger.warning("Write-behind flush of %d %s rows failed, retrying row by row: %s",
+                           len(rows), self.model.__name__, e)
+            written = self._write_rows(rows)
+        with self._cond:
+            self.written += written
+            self.failed += len(rows) - written
+            self.flushes += 1
+
+    def _write_rows(self, rows):
+        written = 0
+        for obj in rows:
+            obj.pk = None  # bulk_create may have set it before the rollback
+            try:
+                with transaction.atomic():
+                    obj.save(force_insert=True)
+                written += 1
+            except Exception as e:
+                logger.error("Write-behind row %r dropped: %s", obj, e)
+        return written
+
+    def close(self, timeout=10.0):
+        """Stop accepting rows and write everything still queued."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error("Write-behind queue did not drain within %.0f s", timeout)
+
+    def stats(self):
+        with self._cond:
+            return {'depth': len(self._rows), 'enqueued': self.enqueued, 'written': self.written,
+                    'dropped': self.dropped, 'failed': self.failed, 'flushes': self.flushes}
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, 'DIET_PLAN_WRITE_BEHIND', False)
+
+
+def get_queue():
+    """The process-wide DietPlan write-behind queue."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                from .models import DietPlan
+                _queue = WriteBehindQueue(
+                    DietPlan,
+                    batch_size=getattr(settings, 'DIET_PLAN_WRITE_BEHIND_BATCH', 100),
+                    flush_ms=getattr(settings, 'DIET_PLAN_WRITE_BEHIND_FLUSH_MS', 200),
+                    max_queue=getattr(settings, 'DIET_PLAN_WRITE_BEHIND_MAX_QUEUE', 10000),
+                )
+    return _queue
+
+
+def write_behind_stats():
+    return _queue.stats() if _queue is not None else None
+
+
+@atexit.register
+def flush_on_shutdown():
+    if _queue is not None:
+        _queue.close()
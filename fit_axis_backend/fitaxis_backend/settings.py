@@ -10,11 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# The ML engine (calorie_model, fuzzy, recommendation) lives in the repo root.
+ML_ENGINE_DIR = BASE_DIR.parent
+if str(ML_ENGINE_DIR) not in sys.path:
+    sys.path.insert(0, str(ML_ENGINE_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -80,9 +87,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep each worker's connection (and its PRAGMA setup) across requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN: under WAL a deferred transaction
+            # that later writes can fail with "database is locked" at once
+            # instead of waiting out busy_timeout.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Applied to every new SQLite connection by diet.sqlite.configure_sqlite.
+# Run `python bench_sqlite.py` to compare against plain SQLite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,           # ms
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -64000,           # KiB (negative = size, not pages)
+    'temp_store': 'MEMORY',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -125,6 +152,38 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ML engine
+# Load the calorie model and meal pools when a server process starts (wsgi.py/asgi.py)
+# instead of on the first request. manage.py commands never warm them.
+ML_WARMUP_ON_START = True
+# Also start the process executor workers there, so the first plan request
+# doesn't wait for them. gunicorn.conf.py turns this off in the preloading
+# master and starts them in each worker instead.
+ML_PRESTART_EXECUTORS = os.environ.get('ML_PRESTART_EXECUTORS', '1') != '0'
+# Upper bound on profiles accepted by predict_calories_batch/ in one request.
+ML_MAX_BATCH_SIZE = 10000
+# Latency budget for one generate_plan/ request (prediction + fuzzy + plan);
+# the plan solver gets whatever the earlier stages leave of it.
+ML_PLAN_BUDGET_MS = 50.0
+# Accepted range (kcal) for generate_plan/'s current_calories; anything else is a 400.
+ML_INTAKE_KCAL_RANGE = (800, 10000)
+# Executor lanes for the async ML views (see diet/executors.py). Each lane
+# caps running + queued tasks at max_pending; beyond that requests get 503.
+#   kind: 'thread' for NumPy-bound work, 'process' for GIL-bound Python work
+ML_EXECUTORS = {
+    'plan': {'kind': 'process', 'workers': 2, 'max_pending': 32},
+    'batch': {'kind': 'thread', 'workers': 1, 'max_pending': 2},
+}
+
+# Write-behind persistence for generate_diet/ (see diet/write_behind.py):
+# plans are returned at once and DietPlan rows are saved by a background
+# thread with one bulk_create per BATCH rows or per FLUSH_MS. Rows beyond
+# MAX_QUEUE are dropped (and counted in ml_stats/).
+DIET_PLAN_WRITE_BEHIND = False
+DIET_PLAN_WRITE_BEHIND_BATCH = 100
+DIET_PLAN_WRITE_BEHIND_FLUSH_MS = 200
+DIET_PLAN_WRITE_BEHIND_MAX_QUEUE = 10000
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
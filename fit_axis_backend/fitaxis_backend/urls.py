@@ -19,5 +19,5 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('generate_diet/', include('diet.urls')),
+    path('', include('diet.urls')),
 ]
\ No newline at end of file
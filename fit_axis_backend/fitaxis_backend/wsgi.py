@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fitaxis_backend.settings')
 
 application = get_wsgi_application()
+
+# Serving processes only (manage.py commands never import this module); with
+# gunicorn's preload_app this runs once in the master, before the fork.
+from diet.engine import warm_on_start  # noqa: E402
+
+warm_on_start()
@@ -0,0 +1,51 @@
+# gunicorn.conf.py — picked up automatically when gunicorn runs from this folder:
+#   gunicorn fitaxis_backend.wsgi
+import os
+import sys
+
+# The ML engine lives in the repo root; settings.py adds it to sys.path too,
+# but this config is read before the app (and settings) are imported.
+ML_ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ML_ENGINE_DIR)
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+# The ML views are async. Under the default sync worker each one runs on
+# its own short-lived event loop; to serve them natively use an ASGI worker:
+#   GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn fitaxis_backend.asgi
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+
+# Import the app (and warm the calorie model in fitaxis_backend/wsgi.py) once in
+# the master, then fork: workers share the model pages copy-on-write.
+preload_app = True
+# Executor pools can't cross that fork, so each worker starts its own
+# (post_worker_init) instead of the master (see ML_PRESTART_EXECUTORS).
+os.environ.setdefault("ML_PRESTART_EXECUTORS", "0")
+
+
+def pre_fork(server, worker):
+    # Freeze the master's heap before every fork so worker GCs never touch
+    # (and thereby copy) the preloaded model objects.
+    try:
+        from calorie_model import preload
+        preload()
+    except Exception as e:
+        # No trained bundle yet: serve without the preloaded model, like
+        # diet.engine.warm_on_start() does, instead of taking the arbiter down.
+        server.log.warning("Calorie model preload skipped: %s", e)
+
+
+def post_worker_init(worker):
+    # Start this worker's plan-lane processes before it takes requests
+    try:
+        from diet.executors import prestart_executors
+        prestart_executors()
+    except Exception as e:
+        worker.log.warning("Executor prestart skipped: %s", e)
+
+
+def worker_exit(server, worker):
+    # Save any DietPlan rows still waiting in the write-behind queue
+    from diet.write_behind import flush_on_shutdown
+    flush_on_shutdown()
@@ -0,0 +1,106 @@
+# flat_forest.py
+# ---------------------------------------------------------
+# Flattened tree-ensemble evaluator for low-latency inference.
+# A trained RandomForestRegressor is exported into five contiguous node
+# arrays (feature, threshold, left, right, value) shared by all trees.
+# Leaves point to themselves, so every tree can be walked in lock-step for
+# a fixed number of levels with plain NumPy fancy indexing — no sklearn
+# input validation, no joblib dispatch, no per-tree Python loop.
+# ---------------------------------------------------------
+import numpy as np
+
+NODE_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+class FlatForest:
+    """Averaging tree ensemble stored as flat node arrays."""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth):
+        # np.asarray drops the np.memmap subclass (and its per-indexing
+        # overhead) while still pointing at the same mapped pages.
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left)
+        self.right = np.asarray(right)
+        self.value = np.asarray(value)
+        self.roots = np.asarray(roots)
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    # -------------------------
+    # Export
+    # -------------------------
+    @classmethod
+    def from_estimator(cls, model):
+        """
+        Flatten a fitted single-output forest of regression trees
+        (RandomForestRegressor / ExtraTreesRegressor).
+        Raises TypeError for anything else.
+        """
+        estimators = getattr(model, "estimators_", None)
+        if not estimators or not all(hasattr(e, "tree_") for e in estimators):
+            raise TypeError(f"Cannot flatten {type(model).__name__}: not a tree forest")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for est in estimators:
+            t = est.tree_
+            if t.n_outputs != 1:
+                raise TypeError("Only single-output forests can be flattened")
+            n = t.node_count
+            ids = np.arange(n, dtype=np.int32) + offset
+            leaf = t.children_left < 0
+
+            # Leaves loop back to themselves so extra levels are no-ops
+            features.append(np.where(leaf, 0, t.feature).astype(np.int32))
+            thresholds.append(np.where(leaf, np.inf, t.threshold).astype(np.float64))
+            lefts.append(np.where(leaf, ids, t.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, ids, t.children_right + offset).astype(np.int32))
+            values.append(t.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, t.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+        )
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in NODE_ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, max_depth):
+        return cls(max_depth=max_depth, **{name: arrays[name] for name in NODE_ARRAYS})
+
+    # -------------------------
+    # Evaluation
+    # -------------------------
+    def predict(self, X):
+        """
+        Mean leaf value over all trees for each row of X (n_rows × n_features).
+        Features are compared in float32, exactly as sklearn's trees do.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(X.shape[0])[:, None]
+
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].mean(axis=1)
@@ -1,62 +1,65 @@
 # fuzzy.py
 # ---------------------------------------------------------
 # Adaptive fuzzy-logic engine for personalized diet plans.
-# Fully dependency-free (no skfuzzy etc.).
+# No fuzzy-logic library needed (no skfuzzy etc.), only NumPy.
 # Handles:
 #   → Fitness Goals: Bulking, Cutting, Weight Loss, Maintain
 #   → Medical History: BP, Diabetes, Fatty Liver, Asthma, Thyroid
 #   → Allergies: Dairy, Gluten
+#   → Age, BMI and calorie target (continuous memberships)
 # Produces gentle scaling & nutrient biases for recommendation.py
+#
+# The rule base is compiled into one weight matrix: each profile becomes a
+# row of membership degrees, and the factors for N profiles are a single
+# (N × rules) @ (rules × factors) product, clipped to each factor's range.
 # ---------------------------------------------------------
+from functools import lru_cache
 
-def _clamp(x, lo, hi):
-    """Keep a value within [lo, hi] range."""
-    return max(lo, min(hi, x))
+import numpy as np
+
+from user_profile import Goal, UserProfile
 
 
 # -------------------------
 # Goal Scoring Functions
 # -------------------------
-def _score_cutting(goal: str) -> float:
+# All helpers take the already-normalized UserProfile fields
+# (a Goal member or None, frozensets of lower-case labels).
+def _score_cutting(goal) -> float:
     """Cutting / Weight loss goals → negative scale, high protein bias."""
-    return 1.0 if (goal or "").lower() in ("cutting", "weight loss") else 0.0
+    return 1.0 if goal in (Goal.CUTTING, Goal.WEIGHT_LOSS) else 0.0
 
-def _score_bulking(goal: str) -> float:
+def _score_bulking(goal) -> float:
     """Bulking goal → positive calorie scale."""
-    return 1.0 if (goal or "").lower() == "bulking" else 0.0
+    return 1.0 if goal is Goal.BULKING else 0.0
 
-def _score_maintain(goal: str) -> float:
+def _score_maintain(goal) -> float:
     """Maintain goal → neutral scale."""
-    return 1.0 if (goal or "").lower() == "maintain" else 0.0
+    return 1.0 if goal is Goal.MAINTAIN else 0.0
 
 
 # -------------------------
 # Medical Condition Scoring
 # -------------------------
-def _score_bp(med_hist) -> float:
+def _score_bp(conditions) -> float:
     """Blood Pressure → needs low salt meals."""
-    tags = [str(m).lower() for m in (med_hist or [])]
-    return 1.0 if ("bp" in tags or "blood pressure" in tags) else 0.0
+    return 1.0 if "bp" in conditions else 0.0
 
-def _score_diabetes(med_hist) -> float:
+def _score_diabetes(conditions) -> float:
     """Diabetes → reduce simple carbs."""
-    tags = [str(m).lower() for m in (med_hist or [])]
-    return 1.0 if "diabetes" in tags else 0.0
+    return 1.0 if "diabetes" in conditions else 0.0
 
-def _score_fatty_liver(med_hist) -> float:
+def _score_fatty_liver(conditions) -> float:
     """Fatty Liver → avoid fatty/oily meals."""
-    tags = [str(m).lower() for m in (med_hist or [])]
-    return 1.0 if "fatty liver" in tags else 0.0
+    return 1.0 if "fatty liver" in conditions else 0.0
 
-def _score_asthma(med_hist) -> float:
+def _score_asthma(conditions) -> float:
     """Asthma → avoid inflammation-triggering foods (spicy/fried)."""
-    tags = [str(m).lower() for m in (med_hist or [])]
-    return 1.0 if "asthma" in tags else 0.0
+    return 1.0 if "asthma" in conditions else 0.0
 
-def _score_thyroid(med_hist) -> float:
+def _score_thyroid(conditions) -> float:
     """Thyroid → avoid excess soy & high-fat foods."""
-    tags = [str(m).lower() for m in (med_hist or [])]
-    return 1.0 if "thyroid" in tags else 0.0
+    return 1.0 if "thyroid" in conditions else 0.0
 
 
 # -------------------------
@@ -64,77 +67,146 @@ def _score_thyroid(med_hist) -> float:
 # -------------------------
 def _score_dairy_allergy(allergies) -> float:
     """Avoid dairy if allergic."""
-    tags = [str(a).lower() for a in (allergies or [])]
-    return 1.0 if "dairy" in tags else 0.0
+    return 1.0 if "dairy" in allergies else 0.0
 
 def _score_gluten_allergy(allergies) -> float:
     """Avoid gluten if allergic."""
-    tags = [str(a).lower() for a in (allergies or [])]
-    return 1.0 if "gluten" in tags else 0.0
+    return 1.0 if "gluten" in allergies else 0.0
+
+
+# -------------------------
+# Continuous Memberships
+# -------------------------
+# (input, start, full): the degree ramps linearly from 0 at `start` to 1 at
+# `full` (descending ramps have full < start). Missing inputs score 0.
+CONTINUOUS_MEMBERSHIPS = {
+    "older":      ("age", 40.0, 65.0),
+    "high_bmi":   ("bmi", 27.0, 35.0),
+    "low_bmi":    ("bmi", 18.5, 16.0),
+    "low_target": ("target", 1600.0, 1200.0),
+}
+
+
+def _ramp(x, start, full):
+    """Vectorized linear membership; NaN (missing) → 0."""
+    return np.nan_to_num(np.clip((x - start) / (full - start), 0.0, 1.0), nan=0.0)
+
+
+def _ramp1(x, start, full):
+    """Scalar _ramp for the single-profile path."""
+    if x is None:
+        return 0.0
+    return min(max((x - start) / (full - start), 0.0), 1.0)
+
+
+def _bmi(weight, height):
+    """BMI from kg / cm (NaN if either is missing or non-positive)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = weight / (height / 100.0) ** 2
+    return np.where((weight > 0) & (height > 0), bmi, np.nan)
+
+
+# -------------------------
+# Rule Base
+# -------------------------
+FACTORS = ("scale", "protein_bias", "salt_caution", "carb_caution", "fat_caution",
+           "inflammation_caution", "soy_caution", "dairy_caution", "gluten_caution")
+
+# Output for a profile with no memberships, and each factor's allowed range
+_BASE = np.array([1.0, 0, 0, 0, 0, 0, 0, 0, 0])
+_LO = np.array([0.93, 0, 0, 0, 0, 0, 0, 0, 0])
+_HI = np.array([1.07, 0.6, 0.8, 0.7, 0.7, 0.8, 0.9, 1.0, 1.0])
+
+# antecedent → contribution per factor at full membership
+RULES = {
+    # Cutting → -5% & high protein; Bulking → +5%; Maintain → neutral
+    "cutting":     {"scale": -0.05, "protein_bias": 0.30},
+    "bulking":     {"scale": 0.05, "protein_bias": 0.15},
+    "maintain":    {},
+    "bp":          {"salt_caution": 0.60},                      # Low-salt for BP
+    "diabetes":    {"carb_caution": 0.50},                      # Less carbs for diabetes
+    "fatty liver": {"fat_caution": 0.45},                       # Less fat for liver
+    "asthma":      {"inflammation_caution": 0.60},              # Anti-inflammatory foods
+    "thyroid":     {"fat_caution": 0.20, "soy_caution": 0.60},  # Less fat & soy for thyroid
+    # Allergies gently modify choices (soft penalties)
+    "dairy":       {"dairy_caution": 0.80},
+    "gluten":      {"gluten_caution": 0.80},
+    # Continuous: keep protein up with age and at low intakes, ease energy
+    # density for high BMI, add a little for low BMI
+    "older":       {"protein_bias": 0.05, "salt_caution": 0.10},
+    "high_bmi":    {"scale": -0.02, "carb_caution": 0.10, "fat_caution": 0.10},
+    "low_bmi":     {"scale": 0.02, "protein_bias": 0.05},
+    "low_target":  {"protein_bias": 0.10},
+}
+RULE_WEIGHTS = np.array([[rule.get(f, 0.0) for f in FACTORS] for rule in RULES.values()])
+RULE_WEIGHTS.flags.writeable = False
+_RULE_ROWS = RULE_WEIGHTS.tolist()
+
+
+@lru_cache(maxsize=1024)
+def _discrete_memberships(goal, conditions, allergies):
+    """Crisp 0/1 degrees of the goal/condition/allergy rules (memoized per combination)."""
+    return (
+        _score_cutting(goal), _score_bulking(goal), _score_maintain(goal),
+        _score_bp(conditions), _score_diabetes(conditions), _score_fatty_liver(conditions),
+        _score_asthma(conditions), _score_thyroid(conditions),
+        _score_dairy_allergy(allergies), _score_gluten_allergy(allergies),
+    )
+
+
+def membership_matrix(profiles, calorie_targets):
+    """(N × rules) membership degrees, columns in RULES order."""
+    profiles = [UserProfile.of(p) for p in profiles]
+    n = len(profiles)
+    discrete = np.array([_discrete_memberships(p.goal, p.conditions, p.allergies)
+                         for p in profiles], dtype=np.float64).reshape(n, -1)
+
+    def column(attr):
+        return np.array([getattr(p, attr) for p in profiles], dtype=np.float64)
+
+    inputs = {
+        "age": column("age"),
+        "bmi": _bmi(column("weight"), column("height")),
+        "target": np.broadcast_to(np.asarray(calorie_targets, dtype=np.float64), (n,)),
+    }
+    continuous = [_ramp(inputs[x], start, full)
+                  for x, start, full in CONTINUOUS_MEMBERSHIPS.values()]
+    return np.column_stack([discrete, *continuous])
 
 
 # -------------------------
 # Main Fuzzy Calculator
 # -------------------------
-def compute_fuzzy_factors(user_data: dict, calorie_target: float) -> dict:
+def fuzzy_matrix(profiles, calorie_targets):
+    """(N × FACTORS) factors for many profiles with one matrix product."""
+    return np.clip(membership_matrix(profiles, calorie_targets) @ RULE_WEIGHTS + _BASE, _LO, _HI)
+
+
+def compute_fuzzy_factors_batch(profiles, calorie_targets):
+    """compute_fuzzy_factors for a list of profiles (targets: one per profile or a scalar)."""
+    return [dict(zip(FACTORS, row)) for row in fuzzy_matrix(profiles, calorie_targets).tolist()]
+
+
+def compute_fuzzy_factors(user_data, calorie_target: float) -> dict:
     """
     Compute adaptive fuzzy scaling values.
     These are used by recommendation.py to filter and scale meals.
+    `user_data` is a UserProfile or a raw profile dict.
     Returns a dictionary of bias & caution factors.
     """
-
-    goal = (user_data.get("Fitness Goal", "") or "").lower()
-    med  = user_data.get("Medical History", []) or []
-    allergies = user_data.get("Allergies", []) or []
-
-    # Goal scores
-    s_cut = _score_cutting(goal)
-    s_bulk = _score_bulking(goal)
-    s_maintain = _score_maintain(goal)
-
-    # Health condition scores
-    s_bp  = _score_bp(med)
-    s_dm  = _score_diabetes(med)
-    s_fl  = _score_fatty_liver(med)
-    s_as  = _score_asthma(med)
-    s_th  = _score_thyroid(med)
-
-    # Allergy scores
-    s_dairy = _score_dairy_allergy(allergies)
-    s_gluten = _score_gluten_allergy(allergies)
-
-    # -------------------------
-    # Global Calorie Scaling
-    # -------------------------
-    # Cutting → -5%; Bulking → +5%; Maintain → neutral
-    scale = 1.0 + 0.05 * (s_bulk - s_cut)
-    scale = _clamp(scale, 0.93, 1.07)
-
-    # -------------------------
-    # Nutrient / Food Biases
-    # -------------------------
-    protein_bias = _clamp(0.30 * s_cut + 0.15 * s_bulk, 0.0, 0.6)  # High for cutting
-    salt_caution = _clamp(0.60 * s_bp, 0.0, 0.8)                   # Low-salt for BP
-    carb_caution = _clamp(0.50 * s_dm, 0.0, 0.7)                   # Less carbs for diabetes
-    fat_caution  = _clamp(0.45 * s_fl + 0.20 * s_th, 0.0, 0.7)     # Less fat for liver/thyroid
-    inflammation_caution = _clamp(0.60 * s_as, 0.0, 0.8)           # Anti-inflammatory foods
-    soy_caution  = _clamp(0.60 * s_th, 0.0, 0.9)                   # Less soy for thyroid
-
-    # Allergies gently modify choices (soft penalties)
-    dairy_caution = _clamp(0.80 * s_dairy, 0.0, 1.0)
-    gluten_caution = _clamp(0.80 * s_gluten, 0.0, 1.0)
-
-    # -------------------------
-    # Final Output
-    # -------------------------
-    return {
-        "scale": scale,
-        "protein_bias": protein_bias,
-        "salt_caution": salt_caution,
-        "carb_caution": carb_caution,
-        "fat_caution": fat_caution,
-        "inflammation_caution": inflammation_caution,
-        "soy_caution": soy_caution,
-        "dairy_caution": dairy_caution,
-        "gluten_caution": gluten_caution,
-    }
+    # Same rules as fuzzy_matrix, in plain floats: for one profile NumPy's
+    # call overhead would cost more than the whole evaluation
+    p = UserProfile.of(user_data)
+    bmi = None
+    if p.weight and p.height and p.weight > 0 and p.height > 0:
+        bmi = p.weight / (p.height / 100.0) ** 2
+    inputs = {"age": p.age, "bmi": bmi, "target": float(calorie_target)}
+    degrees = _discrete_memberships(p.goal, p.conditions, p.allergies) + tuple(
+        _ramp1(inputs[x], start, full) for x, start, full in CONTINUOUS_MEMBERSHIPS.values())
+
+    out = _BASE.tolist()
+    for d, row in zip(degrees, _RULE_ROWS):
+        if d:
+            for k, w in enumerate(row):
+                out[k] += d * w
+    return {f: min(max(v, lo), hi) for f, v, lo, hi in zip(FACTORS, out, _LO.tolist(), _HI.tolist())}
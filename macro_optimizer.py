@@ -0,0 +1,88 @@
+# macro_optimizer.py
+# ---------------------------------------------------------
+# Portion optimizer for calorie + macro targets (pure NumPy).
+# Items are columns of a nutrient matrix A (k nutrients × n items, per
+# serving) and portions x are servings per item. The solver minimizes
+#     ½ Σ_j (w_j · (A x − t)_j / t_j)²  +  costᵀ x
+# subject to lower ≤ x ≤ upper.
+#   solve_portions: exact box-constrained solve for a handful of items
+#                   (coordinate descent on the m × m Gram matrix)
+#   select_items:   greedy forward selection over the whole catalog, one
+#                   vectorized k × n pass per added item, refitting the
+#                   portions of the chosen set after each step
+# Thousands of items return in a few milliseconds. Relative errors keep kcal
+# and grams on one scale.
+# ---------------------------------------------------------
+import numpy as np
+
+
+def _scaled(A, target, weights):
+    target = np.asarray(target, dtype=np.float64)
+    scale = np.asarray(weights, dtype=np.float64) / np.maximum(np.abs(target), 1e-9)
+    return np.asarray(A, dtype=np.float64) * scale[:, None], target * scale
+
+
+def solve_portions(A, target, weights, lower=0.0, upper=2.0, cost=None,
+                   x0=None, iters=100, tol=1e-3):
+    """Bounded least-squares portions for the (few) items in A. Returns x (m,)."""
+    M, b = _scaled(A, target, weights)
+    m = M.shape[1]
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), (m,))
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), (m,))
+    cost = np.zeros(m) if cost is None else np.asarray(cost, dtype=np.float64)
+    x = np.clip(np.ones(m) if x0 is None else np.asarray(x0, dtype=np.float64), lower, upper)
+
+    H = M.T @ M
+    g = M.T @ b - cost
+    diag = np.maximum(np.diag(H), 1e-12).tolist()
+    grad = (H @ x - g).tolist()
+    # Plain Python floats: for a handful of items NumPy's per-element
+    # indexing overhead would dominate the sweep.
+    cols, x, lower, upper = H.T.tolist(), x.tolist(), lower.tolist(), upper.tolist()
+    rng = range(m)
+    for _ in range(iters):
+        moved = 0.0
+        for j in rng:
+            new = min(max(x[j] - grad[j] / diag[j], lower[j]), upper[j])
+            delta = new - x[j]
+            if delta:
+                x[j] = new
+                col = cols[j]
+                for i in rng:
+                    grad[i] += delta * col[i]
+                if abs(delta) > moved:
+                    moved = abs(delta)
+        if moved < tol:
+            break
+    return np.array(x)
+
+
+def select_items(A, target, weights, max_items, lower=0.5, upper=2.0, cost=None):
+    """
+    Pick at most `max_items` items and their portions in [lower, upper].
+    Each step adds the item whose best single portion lowers the objective
+    most, then refits all chosen portions. Stops early once no item helps.
+    Returns (indices, portions).
+    """
+    A = np.asarray(A, dtype=np.float64)
+    n = A.shape[1]
+    cost = np.zeros(n) if cost is None else np.asarray(cost, dtype=np.float64)
+    M, b = _scaled(A, target, weights)
+    norms = np.maximum((M * M).sum(axis=0), 1e-12)
+
+    chosen, x = [], np.array([])
+    residual = b.copy()
+    for _ in range(min(max_items, n)):
+        corr = M.T @ residual - cost
+        alpha = np.clip(corr / norms, lower, upper)
+        gain = alpha * corr - 0.5 * alpha * alpha * norms
+        gain[chosen] = -np.inf
+        j = int(np.argmax(gain))
+        if gain[j] <= 0:
+            break
+        chosen.append(j)
+        x = solve_portions(A[:, chosen], target, weights, lower, upper, cost[chosen],
+                           x0=np.append(x, alpha[j]))
+        residual = b - M[:, chosen] @ x
+    return np.array(chosen, dtype=np.intp), x
+
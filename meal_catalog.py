@@ -0,0 +1,237 @@
+# meal_catalog.py
+# ---------------------------------------------------------
+# Compact, immutable meal catalog (struct-of-arrays, no pandas).
+# Names are interned strings, tags/allergens/medical notes are integer
+# bitsets over shared vocabularies, calories are one float64 array and
+# macros one n × 4 float64 matrix (grams of MACROS per serving).
+# Every transformation (filter, rename, rescale, append) returns a new
+# catalog, so catalogs can be cached and shared between requests freely.
+# ---------------------------------------------------------
+import re
+import sys
+import threading
+
+import numpy as np
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snacks")
+MACROS = ("protein", "carb", "fat", "fiber")
+_MEAL_TYPE_CODES = {m: i for i, m in enumerate(MEAL_TYPES)}
+
+
+class Vocabulary:
+    """
+    Lower-cased label → bit position, shared by all catalogs (max 63 labels).
+    Bits are only allocated while catalogs are built (bit/mask); queries use
+    lookup/lookup_mask, where an unknown label is simply 0 (matches nothing).
+    """
+
+    __slots__ = ("_bits", "_lock")
+
+    def __init__(self):
+        self._bits = {}
+        self._lock = threading.Lock()
+
+    def bit(self, label):
+        label = sys.intern(str(label).lower())
+        b = self._bits.get(label)
+        if b is None:
+            with self._lock:
+                b = self._bits.get(label)
+                if b is None:
+                    if len(self._bits) >= 63:
+                        raise ValueError("Vocabulary is full (63 labels)")
+                    b = self._bits[label] = 1 << len(self._bits)
+        return b
+
+    def mask(self, labels):
+        m = 0
+        for label in labels or ():
+            m |= self.bit(label)
+        return m
+
+    def lookup(self, label):
+        return self._bits.get(str(label).lower(), 0)
+
+    def lookup_mask(self, labels):
+        m = 0
+        for label in labels or ():
+            m |= self.lookup(label)
+        return m
+
+    def labels(self, mask):
+        return [label for label, b in self._bits.items() if mask & b]
+
+
+TAGS = Vocabulary()
+ALLERGENS = Vocabulary()
+MEDICAL_NOTES = Vocabulary()
+
+
+class Meal:
+    """One catalog row, materialized on demand."""
+
+    __slots__ = ("id", "meal_type", "name", "diet", "base_qty", "base_calories",
+                 "macros", "tags", "allergens", "medical_notes")
+
+    def __init__(self, id, meal_type, name, diet, base_qty, base_calories,
+                 macros, tags, allergens, medical_notes):
+        self.id = id
+        self.meal_type = meal_type
+        self.name = name
+        self.diet = diet
+        self.base_qty = base_qty
+        self.base_calories = base_calories
+        self.macros = macros
+        self.tags = tags
+        self.allergens = allergens
+        self.medical_notes = medical_notes
+
+    def as_dict(self):
+        return {s: getattr(self, s) for s in self.__slots__}
+
+
+def _frozen(arr):
+    arr = np.ascontiguousarray(arr)
+    arr.flags.writeable = False
+    return arr
+
+
+class MealCatalog:
+    """Immutable struct-of-arrays meal table."""
+
+    __slots__ = ("ids", "meal_type", "names", "vegetarian", "base_qty",
+                 "calories", "macros", "tag_bits", "allergen_bits", "medical_bits")
+
+    def __init__(self, ids, meal_type, names, vegetarian, base_qty,
+                 calories, macros, tag_bits, allergen_bits, medical_bits):
+        self.ids = _frozen(np.asarray(ids, dtype=np.int32))
+        self.meal_type = _frozen(np.asarray(meal_type, dtype=np.int8))
+        self.names = tuple(names)
+        self.vegetarian = _frozen(np.asarray(vegetarian, dtype=bool))
+        self.base_qty = tuple(base_qty)
+        self.calories = _frozen(np.asarray(calories, dtype=np.float64))
+        self.macros = _frozen(np.asarray(macros, dtype=np.float64).reshape(-1, len(MACROS)))
+        self.tag_bits = _frozen(np.asarray(tag_bits, dtype=np.int64))
+        self.allergen_bits = _frozen(np.asarray(allergen_bits, dtype=np.int64))
+        self.medical_bits = _frozen(np.asarray(medical_bits, dtype=np.int64))
+
+    # -------------------------
+    # Construction
+    # -------------------------
+    @classmethod
+    def from_records(cls, records, first_id=0):
+        """
+        Build from meal dicts (the meal_database row format + a "meal_type"
+        key). Missing macro entries are stored as 0 g.
+        """
+        records = list(records)
+        return cls(
+            ids=range(first_id, first_id + len(records)),
+            meal_type=[_MEAL_TYPE_CODES.get(r.get("meal_type"), -1) for r in records],
+            names=[sys.intern(r["name"]) for r in records],
+            vegetarian=[str(r["diet"]).lower() == "vegetarian" for r in records],
+            base_qty=[sys.intern(r["base_qty"]) for r in records],
+            calories=[r["base_calories"] for r in records],
+            macros=[[(r.get("macros") or {}).get(k, 0.0) for k in MACROS] for r in records],
+            tag_bits=[TAGS.mask(r.get("tags")) for r in records],
+            allergen_bits=[ALLERGENS.mask(r.get("allergens")) for r in records],
+            medical_bits=[MEDICAL_NOTES.mask(r.get("medical_notes")) for r in records],
+        )
+
+    @classmethod
+    def from_database(cls, meal_database):
+        """Flatten {meal_type: [meal, ...]} into one catalog, in database order."""
+        return cls.from_records(
+            dict(m, meal_type=meal_type)
+            for meal_type, meals in meal_database.items() for m in meals
+        )
+
+    def _replace(self, **changes):
+        fields = {s: getattr(self, s) for s in self.__slots__}
+        fields.update(changes)
+        return MealCatalog(**fields)
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def empty(self):
+        return len(self.ids) == 0
+
+    def has_tag(self, tag):
+        return (self.tag_bits & TAGS.lookup(tag)) != 0
+
+    def has_any_allergen(self, allergens):
+        return (self.allergen_bits & ALLERGENS.lookup_mask(allergens)) != 0
+
+    def is_meal_type(self, meal_type):
+        return self.meal_type == _MEAL_TYPE_CODES.get(meal_type, -2)
+
+    def name_matches(self, pattern):
+        """Case-insensitive regex search over names (like str.contains(case=False))."""
+        rx = re.compile(pattern, re.IGNORECASE)
+        return np.fromiter((rx.search(n) is not None for n in self.names),
+                           dtype=bool, count=len(self.names))
+
+    def meal(self, i):
+        return Meal(
+            id=int(self.ids[i]),
+            meal_type=MEAL_TYPES[self.meal_type[i]] if self.meal_type[i] >= 0 else None,
+            name=self.names[i],
+            diet="vegetarian" if self.vegetarian[i] else "non-vegetarian",
+            base_qty=self.base_qty[i],
+            base_calories=float(self.calories[i]),
+            macros=dict(zip(MACROS, self.macros[i].tolist())),
+            tags=TAGS.labels(int(self.tag_bits[i])),
+            allergens=ALLERGENS.labels(int(self.allergen_bits[i])),
+            medical_notes=MEDICAL_NOTES.labels(int(self.medical_bits[i])),
+        )
+
+    def __iter__(self):
+        return (self.meal(i) for i in range(len(self)))
+
+    # -------------------------
+    # Transformations (all return a new catalog)
+    # -------------------------
+    def take(self, indices):
+        idx = np.asarray(indices, dtype=np.intp)
+        return MealCatalog(
+            ids=self.ids[idx], meal_type=self.meal_type[idx],
+            names=[self.names[i] for i in idx], vegetarian=self.vegetarian[idx],
+            base_qty=[self.base_qty[i] for i in idx], calories=self.calories[idx],
+            macros=self.macros[idx],
+            tag_bits=self.tag_bits[idx], allergen_bits=self.allergen_bits[idx],
+            medical_bits=self.medical_bits[idx],
+        )
+
+    def where(self, mask):
+        return self.take(np.flatnonzero(mask))
+
+    def rename(self, mapping):
+        """Exact-name replacements (like Series.replace(dict))."""
+        return self._replace(names=[sys.intern(mapping.get(n, n)) for n in self.names])
+
+    def scale_calories(self, mask, factor):
+        """Rescale the serving energy of the masked rows (macros follow the calories)."""
+        cal = self.calories.copy()
+        cal[mask] *= factor
+        macros = self.macros.copy()
+        macros[mask] *= factor
+        return self._replace(calories=cal, macros=macros)
+
+    def concat(self, other):
+        return MealCatalog(
+            ids=np.concatenate([self.ids, other.ids]),
+            meal_type=np.concatenate([self.meal_type, other.meal_type]),
+            names=self.names + other.names,
+            vegetarian=np.concatenate([self.vegetarian, other.vegetarian]),
+            base_qty=self.base_qty + other.base_qty,
+            calories=np.concatenate([self.calories, other.calories]),
+            macros=np.concatenate([self.macros, other.macros]),
+            tag_bits=np.concatenate([self.tag_bits, other.tag_bits]),
+            allergen_bits=np.concatenate([self.allergen_bits, other.allergen_bits]),
+            medical_bits=np.concatenate([self.medical_bits, other.medical_bits]),
+        )
@@ -0,0 +1,89 @@
+# mem_report.py — RSS / PSS / USS per worker for the calorie model, before and after
+# sharing it across forked workers.
+#
+#   python mem_report.py --workers 4
+#
+# "before": every worker unpickles its own model.joblib (old behaviour).
+# "after":  the master preloads the bundle (mmapped forest arrays + gc.freeze())
+#           and then forks, as gunicorn does with preload_app = True.
+# Linux only (reads /proc/<pid>/smaps_rollup).
+import argparse
+import multiprocessing as mp
+import os
+
+import joblib
+import numpy as np
+
+import calorie_model
+
+PROFILE = {"Age": 30, "Weight": 72.0, "Height": 175.0, "Gender": "Male",
+           "Body Type": "Mesomorph", "Diet Type": "Vegetarian", "Fitness Goal": "Cutting"}
+
+
+def _mem_kb():
+    out = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                out[parts[0][:-1]] = int(parts[1])
+    return {"rss": out["Rss"], "pss": out["Pss"],
+            "uss": out["Private_Clean"] + out["Private_Dirty"]}
+
+
+def _worker(mode, bundle_dir, loaded, measured, conn):
+    if mode == "before":
+        model = joblib.load(os.path.join(calorie_model.active_bundle_dir(bundle_dir), "model.joblib"))
+        bundle = calorie_model.get_bundle(bundle_dir)
+        model.predict(bundle.encoder.encode(PROFILE).reshape(1, -1))
+    else:
+        calorie_model.predict_calories(PROFILE, bundle_dir)
+        calorie_model.predict_calories_batch([PROFILE] * 200, bundle_dir)
+    loaded.wait()      # every worker holds its model before anyone measures
+    conn.send(_mem_kb())
+    measured.wait()    # keep sharers alive until all have measured
+
+
+def run(mode, workers, bundle_dir):
+    ctx = mp.get_context("fork")
+    if mode == "after":
+        calorie_model.preload(bundle_dir)
+    loaded, measured = ctx.Barrier(workers), ctx.Barrier(workers)
+    pipes, procs = [], []
+    for _ in range(workers):
+        parent, child = ctx.Pipe()
+        p = ctx.Process(target=_worker, args=(mode, bundle_dir, loaded, measured, child))
+        p.start()
+        pipes.append(parent)
+        procs.append(p)
+    stats = [c.recv() for c in pipes]
+    for p in procs:
+        p.join()
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-worker memory before/after sharing the calorie model.")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--bundle", default=calorie_model.BUNDLE_DIR)
+    args = ap.parse_args()
+
+    # Run "before" in a child so the parent stays un-preloaded for it
+    ctx = mp.get_context("fork")
+    q = ctx.Queue()
+    p = ctx.Process(target=lambda: q.put(run("before", args.workers, args.bundle)))
+    p.start()
+    before = q.get()
+    p.join()
+    after = run("after", args.workers, args.bundle)
+
+    print(f"{'mode':<8}{'worker':>8}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}")
+    for mode, stats in (("before", before), ("after", after)):
+        for i, s in enumerate(stats):
+            print(f"{mode:<8}{i:>8}{s['rss'] / 1024:>10.1f}{s['pss'] / 1024:>10.1f}{s['uss'] / 1024:>10.1f}")
+        pss = np.sum([s["pss"] for s in stats]) / 1024
+        print(f"{mode:<8}{'total':>8}{'':>10}{pss:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# model_search.py
+# ---------------------------------------------------------
+# Parallel hyperparameter search for the calorie model.
+#   python calorie_model.py --search [--mode grid|random] [--cv 5] [--jobs N]
+#
+# Every (candidate, fold) pair of a k-fold CV runs as its own task in a
+# process pool. Each candidate is then refit once on the training split
+# and measured for model size on disk and single-row / batch inference
+# latency, so the model can be picked on the accuracy/latency trade-off
+# rather than on R² alone.
+# ---------------------------------------------------------
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import (ExtraTreesRegressor, HistGradientBoostingRegressor,
+                              RandomForestRegressor)
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from calorie_model import load_training_data
+from flat_forest import FlatForest
+
+# family -> (estimator class, parameter space, fixed params)
+SEARCH_SPACE = {
+    "random_forest": (
+        RandomForestRegressor,
+        {"n_estimators": [50, 100, 200, 300],
+         "max_depth": [None, 12, 18],
+         "min_samples_leaf": [1, 2, 4],
+         "max_features": [1.0, 0.6, 0.33]},
+        {"random_state": 42},
+    ),
+    "extra_trees": (
+        ExtraTreesRegressor,
+        {"n_estimators": [100, 200, 300],
+         "max_depth": [None, 18],
+         "min_samples_leaf": [1, 2],
+         "max_features": [1.0, 0.6]},
+        {"random_state": 42},
+    ),
+    "hist_gradient_boosting": (
+        HistGradientBoostingRegressor,
+        {"max_iter": [100, 200, 400],
+         "learning_rate": [0.05, 0.1, 0.2],
+         "max_leaf_nodes": [15, 31, 63],
+         "min_samples_leaf": [10, 20]},
+        {"random_state": 42},
+    ),
+}
+
+
+def make_estimator(family, params):
+    cls, _, fixed = SEARCH_SPACE[family]
+    return cls(**fixed, **params)
+
+
+def candidates(mode="random", n_iter=12, families=None):
+    """List of (family, params) to evaluate."""
+    out = []
+    for family in families or SEARCH_SPACE:
+        _, space, _ = SEARCH_SPACE[family]
+        if mode == "grid":
+            grid = ParameterGrid(space)
+        else:
+            grid = ParameterSampler(space, n_iter=min(n_iter, len(ParameterGrid(space))),
+                                    random_state=42)
+        out.extend((family, dict(p)) for p in grid)
+    return out
+
+
+# -------------------------
+# Pool workers
+# -------------------------
+_X = _y = None
+
+
+def _init_worker(X, y):
+    # Data is shipped once per worker process, not once per task
+    global _X, _y
+    _X, _y = X, y
+
+
+def _cv_fold(task):
+    idx, family, params, train_idx, test_idx = task
+    scaler = StandardScaler()
+    X_tr = scaler.fit_transform(_X[train_idx])
+    X_te = scaler.transform(_X[test_idx])
+    model = make_estimator(family, params)
+    model.fit(X_tr, _y[train_idx])
+    preds = model.predict(X_te)
+    return idx, r2_score(_y[test_idx], preds), mean_absolute_error(_y[test_idx], preds)
+
+
+# -------------------------
+# Size / latency measurement (serial, so timings aren't skewed by the pool)
+# -------------------------
+def _median_ms(fn, repeat):
+    ts = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        ts.append(time.perf_counter() - t)
+    return float(np.median(ts) * 1000)
+
+
+def _measure(family, params, X_train, y_train, X_test, y_test, batch_size=1000):
+    model = make_estimator(family, params)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=-1)
+        model.fit(X_train, y_train)
+        model.set_params(n_jobs=None)
+    else:
+        model.fit(X_train, y_train)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        joblib.dump(model, path)
+        size_mb = os.path.getsize(path) / 1e6
+
+    row = X_test[:1]
+    batch = np.resize(X_test, (batch_size, X_test.shape[1]))
+    sklearn_single = _median_ms(lambda: model.predict(row), 25)
+    single = sklearn_single
+    try:
+        forest = FlatForest.from_estimator(model)
+        single = min(single, _median_ms(lambda: forest.predict(row), 200))
+    except TypeError:
+        pass
+
+    preds = model.predict(X_test)
+    return {
+        "holdout_r2": float(r2_score(y_test, preds)),
+        "holdout_mae": float(mean_absolute_error(y_test, preds)),
+        "size_mb": size_mb,
+        "single_ms": single,
+        "sklearn_single_ms": sklearn_single,
+        "batch_ms": _median_ms(lambda: model.predict(batch), 5),
+        "batch_size": batch_size,
+    }
+
+
+def _mark_pareto(results):
+    """Flag candidates not dominated on (cv_mae, single_ms)."""
+    for r in results:
+        r["pareto"] = not any(
+            o["cv_mae"] <= r["cv_mae"] and o["single_ms"] <= r["single_ms"]
+            and (o["cv_mae"] < r["cv_mae"] or o["single_ms"] < r["single_ms"])
+            for o in results
+        )
+
+
+def _write_report(results, best, out_path):
+    with open(out_path + ".json", "w", encoding="utf-8") as f:
+        json.dump({"best": best, "results": results}, f, indent=2)
+
+    lines = [
+        "| family | params | CV R² | CV MAE | holdout MAE | size MB | single ms | batch ms | pareto |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        mark = " **(chosen)**" if r is best else ""
+        lines.append(
+            f"| {r['family']}{mark} | `{json.dumps(r['params'])}` | {r['cv_r2']:.3f} | "
+            f"{r['cv_mae']:.1f} | {r['holdout_mae']:.1f} | {r['size_mb']:.1f} | "
+            f"{r['single_ms']:.2f} | {r['batch_ms']:.1f} | {'✓' if r['pareto'] else ''} |"
+        )
+    with open(out_path + ".md", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+# =========================================================
+# Public API
+# =========================================================
+def search_calorie_model(data_path="fitnessdataset_augmented.xlsx",
+                         target="Current Calorie Intake",
+                         mode="random", n_iter=12, cv=5, n_jobs=None,
+                         families=None, latency_budget_ms=1.0,
+                         report_path="model_search_report"):
+    """
+    Run the search and write <report_path>.json / .md.
+    Returns an unfitted clone of the chosen estimator: the lowest CV MAE whose
+    served single-row latency fits latency_budget_ms (the fastest candidate
+    if none does).
+    """
+    X, y, _, _ = load_training_data(data_path, target)
+    X = X.to_numpy(dtype=np.float64)
+    y = y.to_numpy(dtype=np.float64)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    cands = candidates(mode, n_iter, families)
+    folds = list(KFold(n_splits=cv, shuffle=True, random_state=42).split(X_train))
+    tasks = [(i, fam, params, tr, te) for i, (fam, params) in enumerate(cands) for tr, te in folds]
+    print(f"🔎 {len(cands)} candidates × {cv} folds = {len(tasks)} fits ...")
+
+    scores = {i: [] for i in range(len(cands))}
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(X_train, y_train)) as pool:
+        for i, r2, mae in pool.map(_cv_fold, tasks, chunksize=1):
+            scores[i].append((r2, mae))
+
+    results = []
+    for i, (family, params) in enumerate(cands):
+        r2s, maes = zip(*scores[i])
+        res = {"family": family, "params": params,
+               "cv_r2": float(np.mean(r2s)), "cv_mae": float(np.mean(maes))}
+        res.update(_measure(family, params, X_train, y_train, X_test, y_test))
+        results.append(res)
+        print(f"   {family:<24} MAE {res['cv_mae']:6.1f}  single {res['single_ms']:7.2f} ms  "
+              f"size {res['size_mb']:6.1f} MB")
+
+    _mark_pareto(results)
+    results.sort(key=lambda r: r["cv_mae"])
+    within = [r for r in results if r["single_ms"] <= latency_budget_ms]
+    best = within[0] if within else min(results, key=lambda r: r["single_ms"])
+
+    _write_report(results, best, report_path)
+    print(f"🏆 Chosen: {best['family']} {best['params']} "
+          f"(CV MAE {best['cv_mae']:.1f}, {best['single_ms']:.2f} ms/row)")
+    print(f"📝 Report written to {report_path}.json / {report_path}.md")
+    return clone(make_estimator(best["family"], best["params"]))
@@ -1,7 +1,8 @@
 # predict.py — Final debug version with ML error tracing
 from calorie_model import predict_calories
 from utils import safe_int
-from recommendation import generate_daily_plan
+from recommendation import generate_daily_plan, goal_calorie_target
+from user_profile import UserProfile
 
 print("\n👤 Please enter your details for a personalized diet plan:\n")
 
@@ -43,20 +44,23 @@ age = safe_int(input("Age: "))
 weight = float(input("Weight (kg): "))
 height = float(input("Height (cm): "))
 
-# === Machine Learning Calorie Prediction ===
-print("\n🤖 Predicting your daily calorie needs using machine learning model...")
-user_features = {
+# === Build the profile once (shared by the ML model, fuzzy engine and planner) ===
+profile = UserProfile.of({
+    "Gender": gender,
     "Age": age,
-    "Weight": weight,
     "Height": height,
-    "Gender": gender,
+    "Weight": weight,
     "Body Type": body_type,
     "Diet Type": diet_type,
-    "Goal": goal
-}
+    "Medical History": medical_history,
+    "Allergies": allergies,
+    "Fitness Goal": goal
+})
 
+# === Machine Learning Calorie Prediction ===
+print("\n🤖 Predicting your daily calorie needs using machine learning model...")
 try:
-    predicted_calories = predict_calories(user_features)
+    predicted_calories = predict_calories(profile)
     print(f"Estimated base calorie requirement: {predicted_calories:.0f} kcal")
 except Exception as e:
     print("❌ ML model failed with error:", e)
@@ -70,12 +74,7 @@ else:
     current_calories = safe_int(manual_input)
 
 # === Goal Adjustment (same fixed rule) ===
-if goal.lower() in ["bulking", "bulk"]:
-    target_calories = current_calories + 300
-elif goal.lower() in ["cutting", "weight loss", "lose weight"]:
-    target_calories = current_calories - 300
-else:
-    target_calories = current_calories  # Maintain
+target_calories = goal_calorie_target(current_calories, profile.goal)
 
 # === Summary Output (unchanged format) ===
 print(f"\n⚡ Fitness Profile Summary")
@@ -84,23 +83,8 @@ print(f"   Body Type: {body_type}, Goal: {goal}")
 print(f"⚖️ Current Calorie Intake: {current_calories:.2f} kcal")
 print(f"🎯 Adjusted Calorie Target: {target_calories:.2f} kcal\n")
 
-# === Prepare user_data dictionary for recommendation ===
-user_data = {
-    "Gender": gender,
-    "Age": age,
-    "Height": height,
-    "Weight": weight,
-    "Body Type": body_type,
-    "Diet Type": diet_type,
-    "Medical History": medical_history,
-    "Allergies": allergies,
-    "Fitness Goal": goal
-}
-
-# === Generate Daily Plan ===
-plan = generate_daily_plan(user_data, target_calories)
 # === Generate Daily Plan ===
-plan = generate_daily_plan(user_data, target_calories)
+plan = generate_daily_plan(profile, target_calories)
 
 # === Display Daily Plan ===
 print("\n🍽️ Daily Plan:")
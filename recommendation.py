@@ -1,5 +1,16 @@
-import pandas as pd
+import hashlib
+import json
+import numpy as np
 import random
+import time
+from datetime import date
+from collections import namedtuple
+from functools import lru_cache
+from itertools import combinations
+
+from macro_optimizer import select_items, solve_portions
+from meal_catalog import MACROS, MealCatalog
+from user_profile import CONDITION_KEYS, Goal, UserProfile
 
 # Try to import fuzzy logic (optional but recommended)
 try:
@@ -10,199 +21,240 @@ except Exception:
 # =========================================================
 # INDIAN MEAL DATABASE (Veg + Non-Veg)
 # Clean, low-spice, soy-aware, and dairy-aware meals.
+# `macros` are grams per base_qty serving.
 # =========================================================
 meal_database = {
     "breakfast": [
         {"name": "Egg White Omelet", "diet": "non-vegetarian",
          "base_qty": "4 egg whites + 5g oil (~120g)", "base_calories": 160,
+         "macros": {"protein": 15, "carb": 2, "fat": 10, "fiber": 0},
          "tags": ["protein", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Boiled Eggs", "diet": "non-vegetarian",
          "base_qty": "2 pcs (~100g)", "base_calories": 140,
+         "macros": {"protein": 12, "carb": 1, "fat": 10, "fiber": 0},
          "tags": ["protein", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Paneer Paratha + Curd", "diet": "vegetarian",
          "base_qty": "1 paratha (~100g) + 50g curd", "base_calories": 350,
+         "macros": {"protein": 13, "carb": 38, "fat": 16, "fiber": 3},
          "tags": ["carb", "protein", "dairy", "low_spice"],
          "allergens": ["gluten", "dairy"], "medical_notes": []},
 
         {"name": "Tofu Scramble", "diet": "vegetarian",
          "base_qty": "100g tofu + onion + tomato", "base_calories": 230,
+         "macros": {"protein": 17, "carb": 8, "fat": 14, "fiber": 3},
          "tags": ["protein", "soy", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Sprout Salad", "diet": "vegetarian",
          "base_qty": "100g moong/chana sprouts", "base_calories": 250,
+         "macros": {"protein": 17, "carb": 38, "fat": 3, "fiber": 10},
          "tags": ["protein", "fiber", "low_salt", "low_spice"],
          "allergens": [], "medical_notes": ["diabetes", "bp"]},
 
         {"name": "Boiled Soybeans", "diet": "vegetarian",
          "base_qty": "100g soybeans", "base_calories": 330,
+         "macros": {"protein": 30, "carb": 16, "fat": 16, "fiber": 10},
          "tags": ["protein", "fiber", "soy", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Milk + Almonds", "diet": "vegetarian",
          "base_qty": "200ml milk + 5 almonds", "base_calories": 180,
+         "macros": {"protein": 8, "carb": 11, "fat": 11.5, "fiber": 1},
          "tags": ["dairy", "healthy_fat", "low_spice"], "allergens": ["dairy"], "medical_notes": []},
 
         {"name": "Oats + Milk + Raisins", "diet": "vegetarian",
          "base_qty": "40g oats + 200ml milk + 20g raisins", "base_calories": 340,
+         "macros": {"protein": 12, "carb": 55, "fat": 8, "fiber": 6},
          "tags": ["carb", "dairy", "low_spice"], "allergens": ["dairy", "gluten"], "medical_notes": ["diabetes"]},
     ],
 
     "lunch": [
         {"name": "Boiled Chicken + Rice + Veggies", "diet": "non-vegetarian",
          "base_qty": "150g chicken + 150g rice + 100g veg", "base_calories": 600,
+         "macros": {"protein": 50, "carb": 60, "fat": 17, "fiber": 4},
          "tags": ["protein", "carb", "clean", "low_spice", "low_salt"], "allergens": [], "medical_notes": []},
 
         {"name": "Paneer Bhurji + Rotis", "diet": "vegetarian",
          "base_qty": "100g paneer + 2 rotis (~120g)", "base_calories": 520,
+         "macros": {"protein": 24, "carb": 45, "fat": 27, "fiber": 6},
          "tags": ["protein", "carb", "dairy", "low_spice"], "allergens": ["gluten", "dairy"], "medical_notes": []},
 
         {"name": "Rajma + Rice", "diet": "vegetarian",
          "base_qty": "150g rajma + 150g rice", "base_calories": 550,
+         "macros": {"protein": 20, "carb": 95, "fat": 9, "fiber": 14},
          "tags": ["protein", "carb", "fiber", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Tofu + Rice + Veg Curry", "diet": "vegetarian",
          "base_qty": "100g tofu + 150g rice + 100g veg curry", "base_calories": 450,
+         "macros": {"protein": 18, "carb": 60, "fat": 15, "fiber": 5},
          "tags": ["protein", "carb", "soy", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Moong Dal Khichdi + Curd", "diet": "vegetarian",
          "base_qty": "200g khichdi + 50g curd", "base_calories": 420,
+         "macros": {"protein": 17, "carb": 65, "fat": 10, "fiber": 7},
          "tags": ["protein", "carb", "dairy", "low_spice"], "allergens": ["dairy"], "medical_notes": ["diabetes"]},
 
         {"name": "Chana Masala + Salad", "diet": "vegetarian",
          "base_qty": "150g chana + 100g salad", "base_calories": 380,
+         "macros": {"protein": 17, "carb": 55, "fat": 10, "fiber": 14},
          "tags": ["protein", "fiber", "low_salt", "low_spice"], "allergens": [], "medical_notes": ["diabetes"]},
 
         {"name": "Mix Veg Curry + Bajra Roti", "diet": "vegetarian",
          "base_qty": "150g curry + 1 bajra roti (~50g)", "base_calories": 360,
+         "macros": {"protein": 9, "carb": 48, "fat": 14, "fiber": 10},
          "tags": ["fiber", "low_salt", "low_spice"], "allergens": [], "medical_notes": ["bp", "asthma"]},
 
         {"name": "Lauki Chana Dal + Rice", "diet": "vegetarian",
          "base_qty": "150g lauki + 100g chana dal + 150g rice", "base_calories": 400,
+         "macros": {"protein": 18, "carb": 68, "fat": 6, "fiber": 9},
          "tags": ["protein", "carb", "low_salt", "low_spice"], "allergens": [], "medical_notes": []},
     ],
 
     "dinner": [
         {"name": "Boiled Chicken + Veg Soup", "diet": "non-vegetarian",
          "base_qty": "150g chicken + 200ml soup", "base_calories": 420,
+         "macros": {"protein": 48, "carb": 12, "fat": 20, "fiber": 3},
          "tags": ["protein", "clean", "low_salt", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Paneer Curry + Rotis", "diet": "vegetarian",
          "base_qty": "100g paneer curry + 2 rotis", "base_calories": 500,
+         "macros": {"protein": 22, "carb": 42, "fat": 27, "fiber": 5},
          "tags": ["protein", "carb", "dairy", "low_spice"], "allergens": ["gluten", "dairy"], "medical_notes": []},
 
         {"name": "Tofu + Veggies", "diet": "vegetarian",
          "base_qty": "100g tofu + 150g veggies", "base_calories": 350,
+         "macros": {"protein": 22, "carb": 18, "fat": 21, "fiber": 6},
          "tags": ["protein", "fiber", "soy", "low_salt", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Masoor Dal + Rice + Salad", "diet": "vegetarian",
          "base_qty": "150g dal + 150g rice + 100g salad", "base_calories": 420,
+         "macros": {"protein": 18, "carb": 72, "fat": 6, "fiber": 10},
          "tags": ["protein", "carb", "fiber", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Moong Dal + Roti + Salad", "diet": "vegetarian",
          "base_qty": "150g dal + 1 roti + 100g salad", "base_calories": 380,
+         "macros": {"protein": 18, "carb": 56, "fat": 9, "fiber": 11},
          "tags": ["protein", "fiber", "low_spice"], "allergens": ["gluten"], "medical_notes": ["diabetes"]},
 
         {"name": "Curd + Roti + Sabzi", "diet": "vegetarian",
          "base_qty": "100g curd + 1 roti + 150g sabzi", "base_calories": 350,
+         "macros": {"protein": 12, "carb": 42, "fat": 15, "fiber": 6},
          "tags": ["dairy", "carb", "low_spice"], "allergens": ["gluten", "dairy"], "medical_notes": []},
 
         {"name": "Lauki/Tori Sabzi + Roti", "diet": "vegetarian",
          "base_qty": "150g lauki + 1 roti", "base_calories": 300,
+         "macros": {"protein": 7, "carb": 40, "fat": 12, "fiber": 7},
          "tags": ["fiber", "low_salt", "low_spice"], "allergens": ["gluten"], "medical_notes": ["bp"]},
 
         {"name": "Palak Dal + Rotis", "diet": "vegetarian",
          "base_qty": "150g dal + 2 rotis", "base_calories": 480,
+         "macros": {"protein": 22, "carb": 66, "fat": 14, "fiber": 13},
          "tags": ["protein", "carb", "fiber", "low_spice"], "allergens": ["gluten"], "medical_notes": []},
     ],
 
     "snacks": [
         {"name": "Boiled Eggs", "diet": "non-vegetarian",
          "base_qty": "3 pcs (~150g)", "base_calories": 210,
+         "macros": {"protein": 18, "carb": 1.5, "fat": 15, "fiber": 0},
          "tags": ["protein", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Paneer Cubes", "diet": "vegetarian",
          "base_qty": "100g paneer", "base_calories": 280,
+         "macros": {"protein": 18, "carb": 4, "fat": 21, "fiber": 0},
          "tags": ["protein", "dairy", "low_spice"], "allergens": ["dairy"], "medical_notes": []},
 
         {"name": "Sprouts Chaat", "diet": "vegetarian",
          "base_qty": "100g sprouts", "base_calories": 200,
+         "macros": {"protein": 13, "carb": 30, "fat": 3, "fiber": 8},
          "tags": ["protein", "fiber", "low_salt", "low_spice"], "allergens": [], "medical_notes": ["diabetes"]},
 
         {"name": "Greek Yogurt", "diet": "vegetarian",
          "base_qty": "150g unsweetened yogurt", "base_calories": 160,
+         "macros": {"protein": 15, "carb": 9, "fat": 7, "fiber": 0},
          "tags": ["protein", "dairy", "low_spice"], "allergens": ["dairy"], "medical_notes": []},
 
         {"name": "Soybeans (boiled)", "diet": "vegetarian",
          "base_qty": "50g soybeans", "base_calories": 160,
+         "macros": {"protein": 15, "carb": 8, "fat": 8, "fiber": 5},
          "tags": ["protein", "fiber", "soy", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Fruit Bowl", "diet": "vegetarian",
          "base_qty": "200g mixed fruit", "base_calories": 200,
+         "macros": {"protein": 3, "carb": 46, "fat": 1, "fiber": 6},
          "tags": ["low_salt", "fiber", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Almonds", "diet": "vegetarian",
          "base_qty": "7 pcs (~10g)", "base_calories": 70,
+         "macros": {"protein": 2.5, "carb": 2.5, "fat": 6, "fiber": 1.5},
          "tags": ["healthy_fat", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Walnuts", "diet": "vegetarian",
          "base_qty": "3 halves (~15g)", "base_calories": 90,
+         "macros": {"protein": 2, "carb": 2, "fat": 9, "fiber": 1},
          "tags": ["healthy_fat", "low_spice"], "allergens": [], "medical_notes": []},
 
         {"name": "Raisins", "diet": "vegetarian",
          "base_qty": "20g raisins", "base_calories": 60,
+         "macros": {"protein": 0.5, "carb": 15, "fat": 0, "fiber": 1},
          "tags": ["carb", "low_spice"], "allergens": [], "medical_notes": ["diabetes"]},
 
         {"name": "Roasted Makhana", "diet": "vegetarian",
          "base_qty": "25g makhana", "base_calories": 150,
+         "macros": {"protein": 5, "carb": 20, "fat": 5.5, "fiber": 3},
          "tags": ["low_salt", "fiber", "low_spice"], "allergens": [], "medical_notes": ["bp"]},
     ]
 }
 # =========================================================
-# DataFrame (must come after meal_database)
-# =========================================================
-all_meals_df = pd.concat(
-    {k: pd.DataFrame(v) for k, v in meal_database.items()},
-    names=["meal_type"]
-).reset_index(level=0)
-
+# Meal catalog (must come after meal_database)
 # =========================================================
-# Diabetes-Friendly Replacements
-# =========================================================
-def _make_diabetes_safe(meals_df):
-    """Return a version of meals_df with diabetic-safe swaps."""
-    df = meals_df.copy()
-
-    # Replace risky carb sources
-    df["name"] = df["name"].replace({
-        "Rajma + Rice": "Rajma + Brown Rice",
-        "Lauki Chana Dal + Rice": "Lauki Chana Dal + Brown Rice",
-        "Tofu + Rice + Veg Curry": "Tofu + Millets + Veg Curry",
-        "Boiled Chicken + Rice + Veggies": "Boiled Chicken + Brown Rice + Veggies",
-        "Masoor Dal + Rice + Salad": "Masoor Dal + Brown Rice + Salad",
-        "Moong Dal Khichdi + Curd": "Moong Dal Khichdi + Unsweetened Curd",
-        "Paneer Bhurji + Rotis": "Paneer Bhurji + Multigrain Rotis",
-        "Moong Dal + Roti + Salad": "Moong Dal + Multigrain Roti + Salad",
-        "Curd + Roti + Sabzi": "Unsweetened Curd + Bajra Roti + Sabzi",
-    })
-
-    # Lower-calorie, low-glycemic alternatives
-    df.loc[df["name"].str.contains("rice", case=False), "base_calories"] *= 0.9
-    df.loc[df["name"].str.contains("roti", case=False), "base_calories"] *= 0.9
-    df.loc[df["name"].str.contains("curd", case=False), "base_calories"] *= 0.85
+# Compact struct-of-arrays view used by the whole recommendation path.
+MEAL_CATALOG = MealCatalog.from_database(meal_database)
+
+_all_meals_df = None
+
+
+def __getattr__(name):
+    # Pandas view of the same data, kept for ad-hoc inspection. Built on first
+    # access so importing the engine never pulls in pandas.
+    global _all_meals_df
+    if name == "all_meals_df":
+        if _all_meals_df is None:
+            import pandas as pd
+            _all_meals_df = pd.concat(
+                {k: pd.DataFrame(v) for k, v in meal_database.items()},
+                names=["meal_type"]
+            ).reset_index(level=0)
+        return _all_meals_df
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Items the condition helpers add to a pool (ids after the base catalog)
+_LIVER_SOUP = MealCatalog.from_records([{
+    "name": "Lauki-Turmeric Soup + Ginger",
+    "diet": "vegetarian",
+    "base_qty": "250ml soup",
+    "base_calories": 120.0,
+    "macros": {"protein": 4, "carb": 18, "fat": 3.5, "fiber": 4},
+    "tags": ["low_spice", "fiber", "antioxidant"],
+    "allergens": [],
+    "medical_notes": ["fatty liver"]
+}], first_id=len(MEAL_CATALOG))
+_ASTHMA_SOUP = MealCatalog.from_records([{
+    "name": "Moong Dal Soup + Lemon + Ginger",
+    "diet": "vegetarian",
+    "base_qty": "250ml soup",
+    "base_calories": 150.0,
+    "macros": {"protein": 9, "carb": 22, "fat": 3, "fiber": 5},
+    "tags": ["low_spice", "fiber", "anti_inflammatory"],
+    "allergens": [],
+    "medical_notes": ["asthma"]
+}], first_id=len(MEAL_CATALOG) + 1)
 
-    return df
 # =========================================================
 # Condition-Safe Replacement Helpers
 # =========================================================
-def _make_diabetes_safe(df: pd.DataFrame) -> pd.DataFrame:
+def _make_diabetes_safe(cat: MealCatalog) -> MealCatalog:
     """Lower-GI staples: swap white rice->brown/millets; plain rotis->multigrain/bajra; unsweetened dairy."""
-    d = df.copy()
-
-    # ✅ Convert to float to avoid FutureWarning for dtype mismatch
-    d["base_calories"] = d["base_calories"].astype(float)
-
-    d["name"] = d["name"].replace({
+    d = cat.rename({
         "Rajma + Rice": "Rajma + Brown Rice",
         "Lauki Chana Dal + Rice": "Lauki Chana Dal + Brown Rice",
         "Tofu + Rice + Veg Curry": "Tofu + Millets + Veg Curry",
@@ -215,20 +267,16 @@ def _make_diabetes_safe(df: pd.DataFrame) -> pd.DataFrame:
     })
 
     # Nudge calories slightly down for lower-GI swaps
-    d.loc[d["name"].str.contains("brown rice|millet|multigrain|bajra", case=False), "base_calories"] *= 0.93
+    d = d.scale_calories(d.name_matches("brown rice|millet|multigrain|bajra"), 0.93)
 
     # Keep unsweetened dairy leaner
-    d.loc[d["name"].str.contains("unsweetened curd|unsweetened yogurt", case=False), "base_calories"] *= 0.95
+    d = d.scale_calories(d.name_matches("unsweetened curd|unsweetened yogurt"), 0.95)
 
     return d
 
-def _make_bp_safe(df: pd.DataFrame) -> pd.DataFrame:
+def _make_bp_safe(cat: MealCatalog) -> MealCatalog:
     """Low-salt leaning: prefer 'low_salt' items and rebrand saltier items to low-salt variants."""
-    d = df.copy()
-    d["base_calories"] = d["base_calories"].astype(float)
-
-
-    d["name"] = d["name"].replace({
+    d = cat.rename({
         "Paneer Cubes": "Paneer Cubes (Low-Salt, Homemade)",
         "Chana Masala + Salad": "Chana + Salad (No Packaged Masala)",
         "Boiled Chicken + Rice + Veggies": "Boiled Chicken + Brown Rice + Veggies (Low-Salt)",
@@ -238,22 +286,18 @@ def _make_bp_safe(df: pd.DataFrame) -> pd.DataFrame:
     })
 
     # Encourage low_salt choices via a small calorie nudge (doesn't change selection drastically)
-    d.loc[d["tags"].apply(lambda t: "low_salt" in [x.lower() for x in t]), "base_calories"] *= 0.98
-    return d
+    return d.scale_calories(d.has_tag("low_salt"), 0.98)
 
 
-def _make_fatty_liver_safe(df: pd.DataFrame) -> pd.DataFrame:
+def _make_fatty_liver_safe(cat: MealCatalog) -> MealCatalog:
     """
     Make meal list fatty-liver friendly:
     - Reduce high-fat dairy & soy meals
     - Remove fried or creamy items
     - Prefer lean proteins, fiber, and low-oil meals
     """
-    d = df.copy()
-    d["base_calories"] = d["base_calories"].astype(float)
-
     # Replace high-fat / heavy items with lighter options
-    d["name"] = d["name"].replace({
+    d = cat.rename({
         "Paneer Paratha + Curd": "Oats Cheela + Mint Yogurt (Low-Fat)",
         "Paneer Bhurji + Rotis": "Moong Dal Bhurji + Multigrain Rotis",
         "Paneer Cubes": "Grilled Chicken Cubes (Lean)",
@@ -265,37 +309,22 @@ def _make_fatty_liver_safe(df: pd.DataFrame) -> pd.DataFrame:
     })
 
     # Drop very high-fat, heavy, or processed items altogether
-    d = d[~d["name"].str.contains("fried|deep|butter|cheese|cream", case=False)]
+    d = d.where(~d.name_matches("fried|deep|butter|cheese|cream"))
 
     # Slightly downscale calorie density of dairy/soy foods
-    mask = d["name"].str.contains("paneer|curd|yogurt|tofu|soy", case=False)
-    d.loc[mask, "base_calories"] *= 0.88  # reduce fat impact
+    d = d.scale_calories(d.name_matches("paneer|curd|yogurt|tofu|soy"), 0.88)  # reduce fat impact
 
     # Slightly reward fiber-based or low-salt items (encourage inclusion)
-    d.loc[d["tags"].apply(lambda t: "fiber" in [x.lower() for x in t]), "base_calories"] *= 1.02
-    d.loc[d["tags"].apply(lambda t: "low_salt" in [x.lower() for x in t]), "base_calories"] *= 1.01
+    d = d.scale_calories(d.has_tag("fiber"), 1.02)
+    d = d.scale_calories(d.has_tag("low_salt"), 1.01)
 
     # Add liver-supportive item if not already included
-    add = pd.DataFrame([{
-        "name": "Lauki-Turmeric Soup + Ginger",
-        "diet": "vegetarian",
-        "base_qty": "250ml soup",
-        "base_calories": 120.0,
-        "tags": ["low_spice", "fiber", "antioxidant"],
-        "allergens": [],
-        "medical_notes": ["fatty liver"]
-    }])
-    d = pd.concat([d, add], ignore_index=True)
-
-    return d
+    return d.concat(_LIVER_SOUP)
 
-def _make_asthma_safe(df: pd.DataFrame) -> pd.DataFrame:
+def _make_asthma_safe(cat: MealCatalog) -> MealCatalog:
     """Removes mucus-trigger foods (dairy, soy) and adds anti-inflammatory alternatives."""
-    d = df.copy()
-    d["base_calories"] = d["base_calories"].astype(float)
-
     # Replace known triggers with safer alternatives
-    d["name"] = d["name"].replace({
+    d = cat.rename({
         "Soybeans (boiled)": "Steamed Moong Sprouts + Ginger",
         "Boiled Soybeans": "Green Moong + Carrot Mix",
         "Paneer Paratha + Curd": "Oats Cheela + Mint Chutney",
@@ -306,33 +335,18 @@ def _make_asthma_safe(df: pd.DataFrame) -> pd.DataFrame:
     })
 
     # 🚫 Drop asthma-triggering foods (soy, dairy)
-    d = d[~d["name"].str.contains("tofu|soy|paneer|curd|yogurt", case=False)]
+    d = d.where(~d.name_matches("tofu|soy|paneer|curd|yogurt"))
 
     # ✅ Add anti-inflammatory soup
-    add = pd.DataFrame([{
-        "name": "Moong Dal Soup + Lemon + Ginger",
-        "diet": "vegetarian",
-        "base_qty": "250ml soup",
-        "base_calories": 150.0,
-        "tags": ["low_spice", "fiber", "anti_inflammatory"],
-        "allergens": [],
-        "medical_notes": ["asthma"]
-    }])
-    d = pd.concat([d, add], ignore_index=True)
+    d = d.concat(_ASTHMA_SOUP)
 
     # Small calorie normalization for low-spice benefit
-    d.loc[d["tags"].apply(lambda t: "low_spice" in [x.lower() for x in t]), "base_calories"] *= 0.98
-
-    return d
+    return d.scale_calories(d.has_tag("low_spice"), 0.98)
 
 
-def _make_thyroid_safe(df: pd.DataFrame) -> pd.DataFrame:
+def _make_thyroid_safe(cat: MealCatalog) -> MealCatalog:
     """Anti-goitrogenic bias: remove soy-heavy items; swap to egg/chicken/lentils; keep iodine/selenium sources."""
-    d = df.copy()
-    d["base_calories"] = d["base_calories"].astype(float)
-
-
-    d["name"] = d["name"].replace({
+    d = cat.rename({
         "Tofu + Veggies": "Egg White Scramble + Veggies",
         "Boiled Soybeans": "Steamed Moong Sprouts + Lemon",
         "Soybeans (boiled)": "Green Moong + Cucumber",
@@ -342,25 +356,31 @@ def _make_thyroid_safe(df: pd.DataFrame) -> pd.DataFrame:
     })
 
     # Downweight soy-based items further
-    d.loc[d["name"].str.contains("tofu|soy", case=False), "base_calories"] *= 0.0  # effectively removes them
+    d = d.scale_calories(d.name_matches("tofu|soy"), 0.0)  # effectively removes them
 
     # Small upweight for egg/chicken to preserve protein target
-    d.loc[d["name"].str.contains("egg|chicken", case=False), "base_calories"] *= 1.04
-    return d
+    return d.scale_calories(d.name_matches("egg|chicken"), 1.04)
 
 # =========================================================
 # Helper Functions
 # =========================================================
-def _norm_list(v):
-    if isinstance(v, str): return [v.lower()]
-    if isinstance(v, list): return [str(x).lower() for x in v]
-    return ["none"]
-
-
 def slot_percentages():
     return {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.25, "snacks": 0.15}
 
 
+GOAL_CALORIE_OFFSET = 300
+
+
+def goal_calorie_target(current_calories, goal):
+    """Daily target from current intake: +300 kcal for bulking, -300 for cutting / weight loss."""
+    goal = Goal.parse(goal)
+    if goal is Goal.BULKING:
+        return current_calories + GOAL_CALORIE_OFFSET
+    if goal in (Goal.CUTTING, Goal.WEIGHT_LOSS):
+        return current_calories - GOAL_CALORIE_OFFSET
+    return current_calories  # Maintain
+
+
 def goal_tolerance_and_caps(goal):
     g = (goal or "").lower()
     if g == "bulking":
@@ -384,11 +404,11 @@ def _slot_bounds(cal_target, meal_type, goal, fuzzy=None):
 ## =========================================================
 # Master Medical Filter (calls all condition-safe replacements)
 # =========================================================
-def _apply_medical_filters(df: pd.DataFrame, medical: list, allergies: list) -> pd.DataFrame:
+def _apply_medical_filters(cat: MealCatalog, medical: list, allergies: list) -> MealCatalog:
     """Applies condition-safe replacements IN ORDER and re-checks allergies afterwards."""
     m = [str(x).lower() for x in (medical or [])]
     a = [str(x).lower() for x in (allergies or [])]
-    out = df.copy()
+    out = cat
 
     # ✅ Apply medical condition-based replacements in proper order
     if "diabetes" in m:
@@ -404,47 +424,89 @@ def _apply_medical_filters(df: pd.DataFrame, medical: list, allergies: list) ->
 
     # ✅ Recheck allergies (strict removal of allergens)
     if "dairy" in a or "gluten" in a:
-        out = out[~out["allergens"].apply(lambda al:
-            any(alg in [x.lower() for x in al] for alg in a if alg != "none")
-        )].copy()
+        out = out.where(~out.has_any_allergen([alg for alg in a if alg != "none"]))
 
     # ✅ Safety fallback: if everything is filtered out, use low-spice, high-fiber meals
     if out.empty:
-        out = df[df["tags"].apply(lambda t:
-            "low_spice" in [x.lower() for x in t] and "fiber" in [x.lower() for x in t]
-        )].copy()
+        out = cat.where(cat.has_tag("low_spice") & cat.has_tag("fiber"))
 
     return out
 
 
 # =========================================================
-# STRICT Medical and Allergy Filtering (main entrypoint)
+# Precomputed Filter Pools
 # =========================================================
-def _filter_pool(user_data, meal_type):
-    """Filter meal options for each meal type based on user diet, allergies, and medical conditions."""
-    diet = (user_data.get("Diet Type", "") or "").lower()
-    allergies = _norm_list(user_data.get("Allergies", "none"))
-    medical = _norm_list(user_data.get("Medical History", "none"))
-
+# Only a handful of inputs change the filtered pool: 5 conditions, the
+# catalog's allergens and veg/non-veg. Every request is reduced to that
+# canonical key and the pool is built once per key, then shared.
+_KNOWN_ALLERGENS = frozenset(
+    str(a).lower() for meals in meal_database.values() for m in meals for a in m["allergens"]
+)
+
+
+def _pool_key(user_data, meal_type):
+    """(meal_type, conditions, allergies, vegetarian) — everything the pool depends on."""
+    profile = UserProfile.of(user_data)
+    allergies = profile.allergies
+    # Allergen removal only kicks in for dairy/gluten, and only catalog allergens can match
+    if "dairy" in allergies or "gluten" in allergies:
+        allergy_key = allergies & _KNOWN_ALLERGENS
+    else:
+        allergy_key = frozenset()
+    return meal_type, profile.conditions, allergy_key, profile.vegetarian
+
+
+@lru_cache(maxsize=None)
+def _cached_pool(meal_type, conditions, allergies, vegetarian):
+    """Build the filtered pool (an immutable MealCatalog) for one canonical key."""
     # ✅ Select meals from the correct category
-    subset = all_meals_df[all_meals_df["meal_type"] == meal_type].copy()
+    subset = MEAL_CATALOG.where(MEAL_CATALOG.is_meal_type(meal_type))
 
     # ✅ Apply master medical filter (handles diabetes/BP/asthma/fatty liver/thyroid)
-    subset = _apply_medical_filters(subset, medical, allergies)
+    subset = _apply_medical_filters(subset, sorted(conditions), sorted(allergies))
 
     # ✅ Apply vegetarian-only filtering after replacements
-    if diet == "vegetarian":
-        subset = subset[subset["diet"].str.lower() == "vegetarian"]
+    if vegetarian:
+        subset = subset.where(subset.vegetarian)
 
     # ✅ Fallback to safe high-fiber, low-spice options if nothing remains
     if subset.empty:
-        subset = all_meals_df[
-            all_meals_df["tags"].apply(lambda x: "low_spice" in x and "fiber" in x)
-        ].copy()
+        subset = MEAL_CATALOG.where(MEAL_CATALOG.has_tag("low_spice") & MEAL_CATALOG.has_tag("fiber"))
 
     return subset
 
 
+def precompute_pools(combos=False):
+    """
+    Build every possible pool up front (e.g. at app start). Returns the pool count.
+    With combos=True the slot combination tables are built too, so no plan ever
+    falls back to the greedy solver because a table was cold.
+    """
+    conditions = sorted(set(CONDITION_KEYS.values()))
+    allergens = sorted(_KNOWN_ALLERGENS & {"dairy", "gluten"})
+    for meal_type in meal_database:
+        for nc in range(len(conditions) + 1):
+            for cond in combinations(conditions, nc):
+                for na in range(len(allergens) + 1):
+                    for alg in combinations(allergens, na):
+                        for veg in (False, True):
+                            key = (meal_type, frozenset(cond), frozenset(alg), veg)
+                            _cached_pool(*key)
+                            if combos:
+                                for cap in {caps[meal_type] for _, caps, _ in map(
+                                        goal_tolerance_and_caps, ("bulking", "cutting", ""))}:
+                                    _slot_combos(key, cap)
+    return _cached_pool.cache_info().currsize
+
+
+# =========================================================
+# STRICT Medical and Allergy Filtering (main entrypoint)
+# =========================================================
+def _filter_pool(user_data, meal_type):
+    """Filter meal options for each meal type based on user diet, allergies, and medical conditions."""
+    return _cached_pool(*_pool_key(user_data, meal_type))
+
+
 # =========================================================
 # Core Selection + Scaling
 # =========================================================
@@ -452,71 +514,266 @@ def _scale_row(row, factor):
     return {
         "name": row["name"],
         "calories": int(row["base_calories"] * factor),
-        "qty": f"{factor:.2f} × {row['base_qty']}"
+        "qty": f"{factor:.2f} × {row['base_qty']}",
+        "macros": {k: round(v * factor, 1) for k, v in zip(MACROS, row["macros"])},
     }
 
 
-def _protein_sort_key(row, protein_bias: float):
-    tags = [t.lower() for t in (row.get("tags") or [])]
-    return 0 if ("protein" in tags) else (1 - protein_bias)
+# =========================================================
+# Vectorized Scoring (tag bitsets → penalty matrix)
+# =========================================================
+# Columns of the per-pool score matrix. Each is a 0/1 indicator computed once
+# from the catalog's tag bitsets; a request's fuzzy factors become one weight vector.
+#   not protein | not low_salt | carb | dairy/healthy_fat | soy | not low_spice
+ScoredPool = namedtuple("ScoredPool", ["pool", "features", "nutrients", "rows"])
+
+
+@lru_cache(maxsize=None)
+def _scored_pool(meal_type, conditions, allergies, vegetarian):
+    """Filtered pool plus its precomputed score-feature matrix and output rows."""
+    pool = _cached_pool(meal_type, conditions, allergies, vegetarian)
+    features = np.column_stack([
+        ~pool.has_tag("protein"),
+        ~pool.has_tag("low_salt"),
+        pool.has_tag("carb"),
+        pool.has_tag("dairy") | pool.has_tag("healthy_fat"),
+        pool.has_tag("soy"),
+        ~pool.has_tag("low_spice"),
+    ]).astype(np.float64)
+    rows = tuple(
+        {"name": name, "base_calories": cal, "base_qty": qty, "macros": tuple(mac)}
+        for name, cal, qty, mac in zip(pool.names, pool.calories.tolist(), pool.base_qty,
+                                       pool.macros.tolist())
+    )
+    # kcal + macro grams per serving, one column per item (macro_optimizer layout)
+    nutrients = np.vstack([pool.calories, pool.macros.T])
+    return ScoredPool(pool, features, nutrients, rows)
+
+
+def _score_weights(fuzzy):
+    """Fuzzy factors → weights for the score-feature columns."""
+    f = (fuzzy or {})
+    return np.array([
+        1 - f.get("protein_bias", 0.0),
+        0.6 * f.get("salt_caution", 0.0),
+        0.5 * f.get("carb_caution", 0.0),
+        0.4 * f.get("fat_caution", 0.0),
+        0.6 * f.get("soy_caution", 0.0),
+        0.5 * f.get("inflammation_caution", 0.0),
+    ])
 
 
-def _caution_penalty(row, *, salt_caution, carb_caution, fat_caution,
-                     inflammation_caution, soy_caution):
-    tags = [t.lower() for t in (row.get("tags") or [])]
-    penalty = 0.0
-    if "low_salt" not in tags:
-        penalty += 0.6 * salt_caution
-    if "carb" in tags:
-        penalty += 0.5 * carb_caution
-    if "dairy" in tags or "healthy_fat" in tags:
-        penalty += 0.4 * fat_caution
-    if "soy" in tags:
-        penalty += 0.6 * soy_caution
-    if "low_spice" not in tags:
-        penalty += 0.5 * inflammation_caution
-    return penalty
+# =========================================================
+# Macro Targets
+# =========================================================
+# Daily [kcal, protein g, carb g, fat g, fiber g] — the rows of
+# ScoredPool.nutrients. Protein follows the fuzzy protein bias, fat drops
+# with fat caution and carbs take the remaining energy.
+MACRO_WEIGHTS = np.array([4.0, 2.0, 1.0, 1.0, 0.5])  # kcal matters most
+MAX_PROTEIN_G_PER_KG = 2.2
+FIBER_G_PER_1000_KCAL = 14.0
+
+
+def daily_macro_targets(user_data, calorie_target, fuzzy=None):
+    f = fuzzy or {}
+    kcal = float(calorie_target)
+    protein = kcal * (0.20 + 0.25 * f.get("protein_bias", 0.0)) / 4
+    try:
+        protein = min(protein, MAX_PROTEIN_G_PER_KG * UserProfile.of(user_data).weight)
+    except TypeError:
+        pass
+    fat = kcal * (0.28 - 0.10 * f.get("fat_caution", 0.0)) / 9
+    carb = max(kcal - 4 * protein - 9 * fat, 0.0) / 4
+    fiber = FIBER_G_PER_1000_KCAL * kcal / 1000
+    return np.array([kcal, protein, carb, fat, fiber])
 
 
-def pick_meals_for_slot(user_data, meal_type, calorie_target, fuzzy):
-    goal = (user_data.get("Fitness Goal", "") or "").lower()
+# =========================================================
+# Per-Slot Calorie Solver
+# =========================================================
+# Every combination of up to `cap` items is enumerated once per pool as an
+# (n_combos, cap) array of row indices (padded with n, a zero row), so a
+# request scores all combinations with one gather and keeps the best one
+# whose calories land inside _slot_bounds. Tables stay n_combos * cap in
+# size rather than n_combos * n.
+# Pools too large to enumerate (or a plan past its latency budget) go
+# through macro_optimizer.select_items instead.
+SOLVER_MAX_COMBOS = 50_000
+PLAN_BUDGET_MS = 25.0
+# Weight of the distance from the slot's share of the kcal/macro targets, relative to the penalty
+CENTER_WEIGHT = 0.5
+# Penalty → linear cost per serving for macro_optimizer, and its portion range
+PENALTY_COST = 0.05
+SLOT_PORTION_RANGE = (0.75, 1.5)
+# How far the day-level refit may move a slot's portions
+DAY_PORTION_SLACK = 0.25
+SlotCombos = namedtuple("SlotCombos", ["items", "sizes", "nutrients"])
+
+
+def _n_combos(n, cap):
+    total, c = 0, 1
+    for k in range(1, min(cap, n) + 1):
+        c = c * (n - k + 1) // k
+        total += c
+    return total
+
+
+_SLOT_COMBOS = {}
+_NOT_BUILT = object()
+
+
+def _slot_combos(pool_key, cap, build=True):
+    """
+    All item combinations of size 1..cap for one pool, or None if too many.
+    Built tables are cached; with build=False an unbuilt table is reported
+    as _NOT_BUILT instead of being built (used once a plan is over budget,
+    so a warm cache keeps plans identical however long a request took).
+    """
+    combos = _SLOT_COMBOS.get((pool_key, cap), _NOT_BUILT)
+    if combos is _NOT_BUILT and build:
+        combos = _SLOT_COMBOS[(pool_key, cap)] = _build_slot_combos(pool_key, cap)
+    return combos
+
+
+def _build_slot_combos(pool_key, cap):
+    scored = _scored_pool(*pool_key)
+    n = len(scored.rows)
+    n_combos = _n_combos(n, cap)
+    if n_combos > SOLVER_MAX_COMBOS:
+        return None
+    width = min(cap, n)
+    items = np.full((n_combos, width), n, dtype=np.int32)
+    sizes = np.empty(n_combos, dtype=np.float64)
+    r = 0
+    for k in range(1, width + 1):
+        block = np.array(list(combinations(range(n), k)), dtype=np.int32).reshape(-1, k)
+        items[r:r + len(block), :k] = block
+        sizes[r:r + len(block)] = k
+        r += len(block)
+    padded = np.hstack([scored.nutrients, np.zeros((len(scored.nutrients), 1))])
+    return SlotCombos(items, sizes, padded.T[items].sum(axis=1))
+
+
+def _portion_factor(total, lo, hi):
+    """Smallest portion change that brings a slot total into [lo, hi]."""
+    if total <= 0:
+        return 1.0
+    if total < lo:
+        return lo / total
+    if total > hi:
+        return hi / total
+    return 1.0
+
+
+SlotContext = namedtuple("SlotContext", ["scored", "base_scores", "lo", "hi", "max_items",
+                                         "aim", "combos", "fit", "inside"])
+
+
+def _slot_context(user_data, meal_type, calorie_target, fuzzy, day_target, exact=True):
+    """Everything about one slot that doesn't depend on the random draw (shared across days)."""
+    profile = UserProfile.of(user_data)
+    goal = profile.goal_name
     lo, hi = _slot_bounds(calorie_target, meal_type, goal, fuzzy)
     _, slot_caps, _ = goal_tolerance_and_caps(goal)
     max_items = slot_caps.get(meal_type, 2)
 
-    pool = _filter_pool(user_data, meal_type)
-    if pool.empty:
+    key = _pool_key(profile, meal_type)
+    scored = _scored_pool(*key)
+    # Protein bias + caution penalties for every candidate at once
+    base_scores = scored.features @ _score_weights(fuzzy)
+
+    aim = day_target * slot_percentages()[meal_type]
+    aim[0] = min(max(aim[0], lo), hi)
+
+    combos = _slot_combos(key, max_items, build=exact) if len(scored.rows) else None
+    if combos is _NOT_BUILT:
+        combos = None
+    fit = inside = None
+    if combos is not None:
+        miss = np.abs(combos.nutrients - aim) / np.maximum(aim, 1e-6)
+        fit = CENTER_WEIGHT * (miss @ MACRO_WEIGHTS) / MACRO_WEIGHTS.sum()
+        calories = combos.nutrients[:, 0]
+        inside = (calories >= lo) & (calories <= hi)
+        if not inside.any():
+            # Nothing lands in the band: rank by the gap first
+            fit = np.maximum(lo - calories, calories - hi) + fit * 1e-6
+            inside = None
+    return SlotContext(scored, base_scores, lo, hi, max_items, aim, combos, fit, inside)
+
+
+def _solve_exact(ctx, scores):
+    """Best in-band combination (mean penalty + distance from the slot's aim), else the closest one."""
+    combos = ctx.combos
+    cost = np.append(scores, 0.0)[combos.items].sum(axis=1) / combos.sizes
+    if ctx.inside is None:
+        best = np.argmin(ctx.fit + cost * 1e-6)
+    else:
+        cost += ctx.fit
+        best = np.flatnonzero(ctx.inside)[np.argmin(cost[ctx.inside])]
+    return combos.items[best, :int(combos.sizes[best])].astype(np.intp)
+
+
+def _choose(ctx, scores):
+    """(chosen row indices, portions) for one slot given this draw's scores."""
+    if ctx.combos is not None:
+        chosen = _solve_exact(ctx, scores)
+        # Portions only move as far as needed to reach the slot's band
+        factor = _portion_factor(float(ctx.scored.pool.calories[chosen].sum()), ctx.lo, ctx.hi)
+        portions = np.full(len(chosen), factor)
+    else:
+        chosen, portions = select_items(ctx.scored.nutrients, ctx.aim, MACRO_WEIGHTS, ctx.max_items,
+                                        *SLOT_PORTION_RANGE, cost=PENALTY_COST * scores)
+        if len(chosen) == 0:
+            chosen, portions = np.array([int(np.argmin(scores))]), np.ones(1)
+    order = np.argsort(scores[chosen], kind="stable")
+    return chosen[order], portions[order]
+
+
+def _jitter(rng, n):
+    return np.fromiter((rng.random() for _ in range(n)), dtype=np.float64, count=n) * 0.05
+
+
+def _solve_slot(user_data, meal_type, calorie_target, fuzzy, deadline=None, day_target=None,
+                rng=None):
+    """(scored pool, chosen row indices, portion per chosen row) for one slot."""
+    if rng is None:
+        rng = random.Random(plan_seed(user_data, calorie_target))
+    if day_target is None:
+        day_target = daily_macro_targets(user_data, calorie_target, fuzzy)
+    # ✅ Items whose total lands in [lo, hi]; exact unless over budget
+    exact = deadline is None or time.perf_counter() < deadline
+    ctx = _slot_context(user_data, meal_type, calorie_target, fuzzy, day_target, exact)
+    n = len(ctx.base_scores)
+    if n == 0:
+        return ctx.scored, np.array([], dtype=np.intp), np.array([])
+    chosen, portions = _choose(ctx, ctx.base_scores + _jitter(rng, n))
+    return ctx.scored, chosen, portions
+
+
+def _balance_day(picks, day_target):
+    """Refit every chosen item's portion (±DAY_PORTION_SLACK) against the day's kcal + macro targets."""
+    parts = [(scored.nutrients[:, chosen], portions) for scored, chosen, portions in picks.values()]
+    if not any(len(p) for _, p in parts):
+        return picks
+    A = np.hstack([a for a, _ in parts])
+    p = np.concatenate([p for _, p in parts])
+    x = solve_portions(A, day_target, MACRO_WEIGHTS, lower=p * (1 - DAY_PORTION_SLACK),
+                       upper=p * (1 + DAY_PORTION_SLACK), x0=p)
+    out, i = {}, 0
+    for meal, (scored, chosen, _) in picks.items():
+        out[meal] = (scored, chosen, x[i:i + len(chosen)])
+        i += len(chosen)
+    return out
+
+
+def _slot_rows(scored, chosen, portions):
+    if len(chosen) == 0:
         return [{"name": "⚠️ No suitable meal", "calories": 0, "qty": ""}]
+    return [_scale_row(scored.rows[i], float(f)) for i, f in zip(chosen, portions)]
 
-    f = (fuzzy or {})
-    protein_bias = f.get("protein_bias", 0.0)
-    salt_caution = f.get("salt_caution", 0.0)
-    carb_caution = f.get("carb_caution", 0.0)
-    fat_caution = f.get("fat_caution", 0.0)
-    inflammation_caution = f.get("inflammation_caution", 0.0)
-    soy_caution = f.get("soy_caution", 0.0)
-
-    scored = []
-    for idx, row in pool.iterrows():
-        base = _protein_sort_key(row, protein_bias)
-        penalty = _caution_penalty(
-            row,
-            salt_caution=salt_caution,
-            carb_caution=carb_caution,
-            fat_caution=fat_caution,
-            inflammation_caution=inflammation_caution,
-            soy_caution=soy_caution,
-        )
-        scored.append((base + penalty + random.random() * 0.05, idx))
-
-    scored.sort(key=lambda x: x[0])
-    indices = [i for _, i in scored]
-
-    chosen = []
-    for idx in indices[:max_items]:
-        row = pool.loc[idx]
-        chosen.append(_scale_row(row, 1.0))
-    return chosen
+
+def pick_meals_for_slot(user_data, meal_type, calorie_target, fuzzy, deadline=None, rng=None):
+    return _slot_rows(*_solve_slot(user_data, meal_type, calorie_target, fuzzy, deadline, rng=rng))
 
 
 # =========================================================
@@ -538,6 +795,8 @@ def adjust_to_match_target(plan, calorie_target, fuzzy):
         for item in items:
             item["calories"] = int(item["calories"] * final_scale)
             item["qty"] = f"{final_scale:.2f} × {item['qty']}"
+            if "macros" in item:
+                item["macros"] = {k: round(v * final_scale, 1) for k, v in item["macros"].items()}
     plan["Total Calories"] = int(calorie_target)
 
     notes = [
@@ -552,15 +811,104 @@ def adjust_to_match_target(plan, calorie_target, fuzzy):
     return plan
 
 
+# =========================================================
+# Deterministic Seeding (cacheable plans)
+# =========================================================
+# Every plan draws its jitter from its own random.Random, seeded from the
+# profile digest, the calorie target and the date. The same inputs give a
+# byte-identical plan (for the whole day by default), and requests never
+# share or contend on the global RNG.
+def plan_seed(user_data, calorie_target, day=None):
+    """Stable 64-bit seed from the profile, calorie target and date (default: today)."""
+    payload = json.dumps([UserProfile.of(user_data).digest, round(float(calorie_target), 2),
+                          str(day or date.today())])
+    return int.from_bytes(hashlib.sha256(payload.encode("utf-8")).digest()[:8], "big")
+
+
 # =========================================================
 # Public API
 # =========================================================
-def generate_daily_plan(user_data, calorie_target):
-    fuzzy = compute_fuzzy_factors(user_data, calorie_target) if callable(compute_fuzzy_factors) else None
+def generate_daily_plan(user_data, calorie_target, seed=None, day=None, fuzzy=None,
+                        budget_ms=PLAN_BUDGET_MS):
+    """
+    One day's plan for a UserProfile (or a raw profile dict). The jitter
+    comes from `seed`, or from plan_seed(profile, target, day) when no seed
+    is given, so identical inputs on the same day always return the same plan.
+    Pass precomputed `fuzzy` factors to skip recomputing them; slots still
+    unsolved after `budget_ms` switch to the greedy solver.
+    """
+    user_data = UserProfile.of(user_data)
+    rng = random.Random(plan_seed(user_data, calorie_target, day) if seed is None else seed)
+    if fuzzy is None and callable(compute_fuzzy_factors):
+        fuzzy = compute_fuzzy_factors(user_data, calorie_target)
+    day_target = daily_macro_targets(user_data, calorie_target, fuzzy)
+    deadline = time.perf_counter() + budget_ms / 1000
+    picks = {meal: _solve_slot(user_data, meal, calorie_target, fuzzy, deadline, day_target, rng)
+             for meal in ["breakfast", "lunch", "dinner", "snacks"]}
+    picks = _balance_day(picks, day_target)
+
     plan, total = {}, 0
-    for meal in ["breakfast", "lunch", "dinner", "snacks"]:
-        items = pick_meals_for_slot(user_data, meal, calorie_target, fuzzy)
+    for meal, pick in picks.items():
+        items = _slot_rows(*pick)
         plan[meal.title()] = items
         total += sum(x["calories"] for x in items)
     plan["Total Calories"] = total
-    return adjust_to_match_target(plan, calorie_target, fuzzy)
\ No newline at end of file
+    return adjust_to_match_target(plan, calorie_target, fuzzy)
+
+# =========================================================
+# Weekly Plans (one pass, variety across days)
+# =========================================================
+# An item used in the previous VARIETY_WINDOW days gets RECENT_PENALTY, and
+# every earlier use this week adds REPEAT_PENALTY, so meals rotate while the
+# calorie bands and macro targets still decide within each day.
+VARIETY_WINDOW = 2
+RECENT_PENALTY = 1.0
+REPEAT_PENALTY = 0.3
+
+
+def generate_weekly_plan(user_data, calorie_target, days=7, seed=None, start=None):
+    """
+    Plans for `days` consecutive days, returned as {"Day 1": plan, ...} with
+    each plan shaped like generate_daily_plan(). Fuzzy factors, targets,
+    pools, penalties and slot combinations are computed once for the whole
+    run; each day draws new jitter, adds the variety penalties, and still
+    refits its own portions (_balance_day) and builds its output rows.
+    That refit is most of a day's cost and depends on the day's picks, so a
+    week is only ~1.3-1.8x faster than seven generate_daily_plan() calls.
+    Seeded like generate_daily_plan(), from the `start` date.
+    """
+    user_data = UserProfile.of(user_data)
+    rng = random.Random(plan_seed(user_data, calorie_target, start) if seed is None else seed)
+    fuzzy = compute_fuzzy_factors(user_data, calorie_target) if callable(compute_fuzzy_factors) else None
+    day_target = daily_macro_targets(user_data, calorie_target, fuzzy)
+    meals = ["breakfast", "lunch", "dinner", "snacks"]
+    contexts = {meal: _slot_context(user_data, meal, calorie_target, fuzzy, day_target)
+                for meal in meals}
+    uses = {meal: np.zeros(len(ctx.base_scores)) for meal, ctx in contexts.items()}
+    last_day = {meal: np.full(len(ctx.base_scores), -np.inf) for meal, ctx in contexts.items()}
+
+    week = {}
+    for day in range(days):
+        picks = {}
+        for meal, ctx in contexts.items():
+            n = len(ctx.base_scores)
+            if n == 0:
+                picks[meal] = (ctx.scored, np.array([], dtype=np.intp), np.array([]))
+                continue
+            scores = (ctx.base_scores + _jitter(rng, n)
+                      + REPEAT_PENALTY * uses[meal]
+                      + RECENT_PENALTY * (day - last_day[meal] <= VARIETY_WINDOW))
+            chosen, portions = _choose(ctx, scores)
+            uses[meal][chosen] += 1
+            last_day[meal][chosen] = day
+            picks[meal] = (ctx.scored, chosen, portions)
+        picks = _balance_day(picks, day_target)
+
+        plan, total = {}, 0
+        for meal, pick in picks.items():
+            items = _slot_rows(*pick)
+            plan[meal.title()] = items
+            total += sum(x["calories"] for x in items)
+        plan["Total Calories"] = total
+        week[f"Day {day + 1}"] = adjust_to_match_target(plan, calorie_target, fuzzy)
+    return week
@@ -0,0 +1,189 @@
+# user_profile.py
+# ---------------------------------------------------------
+# Canonical, immutable user profile shared by fuzzy.py,
+# recommendation.py and calorie_model.py.
+# A request's user_data dict is normalized ONCE at the boundary:
+#   → goal / diet / body type interned as enums
+#   → medical conditions and allergies as lower-cased frozensets
+#   → numbers parsed to floats (None when missing)
+# and hashed to a stable digest (identical across processes), so the
+# profile itself is a cheap cache key. The original fields stay readable
+# through .get() for the model's feature encoder. The digest covers every
+# input field the planners or the model read (PROFILE_FIELDS), canonicalized
+# (numbers as floats, text stripped and lower-cased, label lists as sorted
+# sets), and nothing else: extra request keys, "30" vs 30 and list order or
+# case do not change it.
+# ---------------------------------------------------------
+import hashlib
+import json
+import sys
+from enum import Enum
+from types import MappingProxyType
+
+
+class _Label(str, Enum):
+    @classmethod
+    def parse(cls, value):
+        """Case/whitespace-insensitive lookup; None for blank or unknown values."""
+        if isinstance(value, cls):
+            return value
+        return cls._value2member_map_.get(str(value or "").strip().lower())
+
+
+class Goal(_Label):
+    BULKING = "bulking"
+    CUTTING = "cutting"
+    WEIGHT_LOSS = "weight loss"
+    MAINTAIN = "maintain"
+
+
+class Diet(_Label):
+    VEGETARIAN = "vegetarian"
+    NON_VEGETARIAN = "non-vegetarian"
+
+
+class BodyType(_Label):
+    ECTOMORPH = "ectomorph"
+    MESOMORPH = "mesomorph"
+    ENDOMORPH = "endomorph"
+
+
+# Medical history label → canonical condition key
+CONDITION_KEYS = {
+    "diabetes": "diabetes",
+    "bp": "bp",
+    "blood pressure": "bp",
+    "fatty liver": "fatty liver",
+    "asthma": "asthma",
+    "thyroid": "thyroid",
+}
+
+
+# Every field the planners or the calorie model read; the profile key covers
+# these and nothing else.
+PROFILE_FIELDS = (
+    "Gender", "Age", "Weight", "Height", "Body Type", "Diet Type", "Fitness Goal", "Goal",
+    "Medical History", "Allergies", "How many meals do you have daily?",
+    "What type of food do you eat the most?", "How much do you usually eat in every meal(Portion)?",
+)
+_LABEL_FIELDS = frozenset({"Medical History", "Allergies"})
+
+
+def _labels(v):
+    """Lower-cased, stripped labels of a str/list field ("none" and blanks dropped)."""
+    if isinstance(v, str):
+        v = [v]
+    elif not isinstance(v, (list, tuple, set, frozenset)):
+        return frozenset()
+    labels = (sys.intern(str(x).strip().lower()) for x in v)
+    return frozenset(x for x in labels if x and x != "none")
+
+
+def _number(v):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return None if v != v else v
+
+
+def _canonical(field, v):
+    """Comparable form of one input field (None when blank/missing)."""
+    if field in _LABEL_FIELDS or isinstance(v, (list, tuple, set, frozenset)):
+        return tuple(sorted(_labels(v))) or None
+    number = _number(v) if not isinstance(v, bool) else None
+    if number is not None:
+        return number
+    v = str(v).strip().lower() if v is not None else ""
+    return v or None
+
+
+def _frozen_value(v):
+    if isinstance(v, (set, frozenset)):
+        return tuple(sorted(v, key=str))  # set order varies between processes
+    return tuple(v) if isinstance(v, list) else v
+
+
+class UserProfile:
+    """Immutable, hashable view of one user's inputs."""
+
+    __slots__ = ("gender", "age", "weight", "height", "body_type", "diet", "goal",
+                 "conditions", "allergies", "digest", "_key", "_hash", "_fields")
+
+    def __init__(self, fields):
+        fields = {str(k): _frozen_value(v) for k, v in fields.items()}
+        gender = str(fields.get("Gender") or "").strip().lower()
+        medical = _labels(fields.get("Medical History"))
+        goal = fields.get("Fitness Goal")
+        if goal is None:
+            goal = fields.get("Goal")
+
+        set_ = object.__setattr__
+        set_(self, "_fields", MappingProxyType(fields))
+        set_(self, "gender", sys.intern(gender) if gender else None)
+        set_(self, "age", _number(fields.get("Age")))
+        set_(self, "weight", _number(fields.get("Weight")))
+        set_(self, "height", _number(fields.get("Height")))
+        set_(self, "body_type", BodyType.parse(fields.get("Body Type")))
+        set_(self, "diet", Diet.parse(fields.get("Diet Type")))
+        set_(self, "goal", Goal.parse(goal))
+        set_(self, "conditions", frozenset(CONDITION_KEYS[m] for m in medical if m in CONDITION_KEYS))
+        set_(self, "allergies", _labels(fields.get("Allergies")))
+
+        # The normalized attributes above are all derived from these fields
+        key = tuple((f, c) for f in PROFILE_FIELDS if (c := _canonical(f, fields.get(f))) is not None)
+        digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+        set_(self, "_key", key)
+        set_(self, "digest", digest)
+        set_(self, "_hash", int(digest[:16], 16))
+
+    @classmethod
+    def of(cls, user_data):
+        """Return `user_data` if it already is a UserProfile, else build one from the dict."""
+        return user_data if isinstance(user_data, cls) else cls(user_data or {})
+
+    # -------------------------
+    # Derived flags
+    # -------------------------
+    @property
+    def goal_name(self):
+        """Lower-case goal ("" if unknown), the form the planners compare against."""
+        return self.goal.value if self.goal else ""
+
+    @property
+    def vegetarian(self):
+        return self.diet is Diet.VEGETARIAN
+
+    # -------------------------
+    # Mapping access (original fields, e.g. for the feature encoder)
+    # -------------------------
+    def get(self, key, default=None):
+        return self._fields.get(key, default)
+
+    def as_dict(self):
+        return dict(self._fields)
+
+    # -------------------------
+    # Immutability / hashing
+    # -------------------------
+    def __setattr__(self, name, value):
+        raise AttributeError("UserProfile is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("UserProfile is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, UserProfile):
+            return NotImplemented
+        return self._hash == other._hash and self._key == other._key
+
+    def __reduce__(self):
+        return UserProfile, (dict(self._fields),)
+
+    def __repr__(self):
+        return (f"UserProfile(goal={self.goal_name or None!r}, diet={self.diet and self.diet.value!r}, "
+                f"conditions={sorted(self.conditions)}, allergies={sorted(self.allergies)}, "
+                f"digest={self.digest[:12]!r})")